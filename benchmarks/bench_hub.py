@@ -0,0 +1,118 @@
+"""Benchmark the PAM245 UDP hub with 1 to 100 simulated amplifiers.
+
+Every simulated amplifier is a UDP endpoint on localhost. Each round, every
+amplifier reports a volume change (inbound) and gets a volume command from
+its PAM245Api (outbound). Reported per amplifier and per round:
+
+- inbound latency: amplifier sends "Volume NN" until the API callback runs
+- outbound latency: set_volume() until the datagram reaches the amplifier
+- event loop CPU time per amplifier per round
+
+Run from the repository root:
+
+    python benchmarks/bench_hub.py [--rounds N] [--amps 1,10,50,100]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__),
+                                '..', 'custom_components', 'pam245'))
+
+from pam245 import LOCALHOST, PAM245DatagramHub  # noqa: E402
+
+RX_PORT = 42000
+
+
+class SimulatedAmp(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.transport = None
+        self.received = asyncio.Queue()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.received.put_nowait(time.perf_counter())
+        # Echo every command and prompt for more like the amplifier does
+        self.transport.sendto(b''.join(
+            line + b'\r\nPA>' for line in data.split(b'\r\n')[:-1]))
+
+
+async def run(amp_count: int, rounds: int) -> dict:
+    loop = asyncio.get_running_loop()
+    hub = PAM245DatagramHub()
+    await hub.start(loop, RX_PORT)
+
+    amps = []
+    for _ in range(amp_count):
+        transport, amp = await loop.create_datagram_endpoint(
+                SimulatedAmp, (LOCALHOST, 0), remote_addr=(LOCALHOST, RX_PORT))
+        api = hub.add_device(transport.get_extra_info('sockname')[:2])
+        amps.append((amp, api))
+
+    # Drain the connection handshake
+    await asyncio.sleep(0.1)
+    for amp, _ in amps:
+        while not amp.received.empty():
+            amp.received.get_nowait()
+
+    inbound = []
+    outbound = []
+    cpu_start = time.process_time()
+    for i in range(rounds):
+        volume = 10 + (2 * i) % 60
+        updated = []
+        for amp, api in amps:
+            done = loop.create_future()
+            callback = (lambda done=done:
+                        done.done() or done.set_result(time.perf_counter()))
+            api.add_callback(callback, ('volume',))
+            updated.append((time.perf_counter(), done, callback, api))
+            # On a line of its own, the prompt line holds the typed echo
+            amp.transport.sendto(f'\r\nVolume {volume:02}\r\n'.encode())
+        for sent, done, callback, api in updated:
+            inbound.append(await done - sent)
+            api.remove_callback(callback)
+
+        # Outbound, to a value the device has not just reported
+        sent = time.perf_counter()
+        for amp, api in amps:
+            api.set_volume(volume + 1)
+        for amp, api in amps:
+            outbound.append(await amp.received.get() - sent)
+
+        # Let the link pacing settle before the next round
+        await asyncio.sleep(2 * 12 / api.LINK_BYTES_PER_SECOND)
+    cpu = time.process_time() - cpu_start
+
+    for amp, _ in amps:
+        amp.transport.close()
+    hub.stop()
+    await asyncio.sleep(0)
+
+    return {
+        'amps': amp_count,
+        'inbound_ms': statistics.median(inbound) * 1e3,
+        'outbound_ms': statistics.median(outbound) * 1e3,
+        'cpu_us': cpu / (amp_count * rounds) * 1e6,
+        }
+
+
+async def main(amp_counts: list[int], rounds: int) -> None:
+    print(f"{'amps':>5} {'inbound ms':>11} {'outbound ms':>12} {'cpu us/amp':>11}")
+    for amp_count in amp_counts:
+        result = await run(amp_count, rounds)
+        print(f"{result['amps']:>5} {result['inbound_ms']:>11.3f}"
+              f" {result['outbound_ms']:>12.3f} {result['cpu_us']:>11.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--amps', default='1,10,50,100')
+    args = parser.parse_args()
+    asyncio.run(main([int(n) for n in args.amps.split(',')], args.rounds))
@@ -0,0 +1,211 @@
+"""Benchmark the PAM245 protocol hot paths and guard them against regressions.
+
+No hardware is needed, everything runs against a bare PAM245Api:
+
+- framing and parsing throughput on a device session replayed from the
+  simulator, delivered in serial-sized chunks, single bytes and one huge
+  chunk, and on a stream with line noise
+- dispatch cost per event, with the framing already done
+- callback fan-out cost with 1 to 50 subscribed entities
+- outbound command encoding and sending
+
+Run from the repository root:
+
+    python benchmarks/bench_protocol.py --save     # record a baseline
+    python benchmarks/bench_protocol.py            # compare against it
+
+The comparison exits non-zero when any benchmark got slower than the baseline
+by more than the tolerance. Timings depend on the machine, so baselines are
+not shared and only compare runs on the same machine.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__),
+                                '..', 'custom_components', 'pam245'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+
+from pam245 import PAM245Api, PAM245LineFramer, SWITCH_COMMANDS  # noqa: E402
+from simulator import PAM245Simulator  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Read size of a typical USB serial adapter
+SERIAL_CHUNK = 32
+
+# Entities subscribed per field, as the platforms register them
+ENTITY_FIELDS = [('volume',), ('volume', 'mute', 'power'),
+                 *((key,) for key in SWITCH_COMMANDS)]
+
+
+def session_stream(rounds: int = 20) -> bytes:
+    """A device session: connection handshake, then a user changing things."""
+    simulator = PAM245Simulator(send_fn=None)
+    commands = ['', 'Version', 'Now']
+    for i in range(rounds):
+        commands += [f'Volume {10 + i % 60:02}', f'Mute {i % 2}',
+                     f'Zone {i % 6} {i % 2}', 'Now']
+    return b''.join(
+        (f'{command}\r\n'
+         + ''.join(f'{event}\r\n' for event in simulator.handle_command(command))
+         + 'PA>').encode()
+        for command in commands)
+
+
+def noisy_stream(stream: bytes, rate: float = 0.02, seed: int = 1) -> bytes:
+    """The stream with random garbage bytes, as from a flaky link."""
+    rng = random.Random(seed)
+    noisy = bytearray()
+    for byte in stream:
+        if rng.random() < rate:
+            noisy.append(rng.randrange(256))
+        noisy.append(byte)
+    return bytes(noisy)
+
+
+def chunks(data: bytes, size: int) -> list[bytes]:
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def make_api(subscribers: int = 0) -> PAM245Api:
+    api = PAM245Api()
+    api._send_data_to_device = lambda data: None
+    for i in range(subscribers):
+        api.add_callback(lambda: None, ENTITY_FIELDS[i % len(ENTITY_FIELDS)])
+    return api
+
+
+def bench_parse(packets: list[bytes]):
+    api = make_api()
+
+    def run():
+        for packet in packets:
+            api.parse_data_from_device(packet)
+    return run, sum(map(len, packets)), 'byte'
+
+
+def bench_framer(packets: list[bytes]):
+    framer = PAM245LineFramer()
+
+    def run():
+        for packet in packets:
+            framer.feed(packet)
+    return run, sum(map(len, packets)), 'byte'
+
+
+def bench_dispatch(stream: bytes):
+    api = make_api()
+    events = PAM245LineFramer().feed(stream)
+
+    def run():
+        api._process_events_from_device(events)
+    return run, len(events), 'event'
+
+
+def bench_fanout(subscribers: int):
+    api = make_api(subscribers)
+    # Alternate the volume so every event is a change worth publishing
+    events = [[['Volume', f'{10 + i % 2:02}']] for i in range(100)]
+
+    def run():
+        for event in events:
+            api._process_events_from_device(event)
+    return run, len(events), 'notify'
+
+
+def bench_commands():
+    api = make_api()
+    keys = list(SWITCH_COMMANDS)
+
+    def run():
+        for i in range(100):
+            api._send_command(api._volume_command(i % 80))
+            api._send_command(api._switch_command(keys[i % len(keys)], i % 2))
+    return run, 200, 'command'
+
+
+def benchmarks() -> dict:
+    session = session_stream()
+    noisy = noisy_stream(session)
+    huge = session * 50
+    return {
+        'parse/serial_chunks': bench_parse(chunks(session, SERIAL_CHUNK)),
+        'parse/single_bytes': bench_parse(chunks(session, 1)),
+        'parse/huge_chunk': bench_parse([huge]),
+        'parse/noise': bench_parse(chunks(noisy, SERIAL_CHUNK)),
+        'framer/serial_chunks': bench_framer(chunks(session, SERIAL_CHUNK)),
+        'framer/single_bytes': bench_framer(chunks(session, 1)),
+        'framer/huge_chunk': bench_framer([huge]),
+        'dispatch': bench_dispatch(session),
+        'fanout/1': bench_fanout(1),
+        'fanout/10': bench_fanout(10),
+        'fanout/50': bench_fanout(50),
+        'commands': bench_commands(),
+        }
+
+
+def measure(run, repeat: int) -> float:
+    # Autorange to ~0.2 s per sample, the fastest sample has the least noise
+    timer = timeit.Timer(run)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def main(args) -> int:
+    # Noise and the lazy debug log would otherwise measure the logging
+    logging.disable(logging.WARNING)
+
+    results = {}
+    for name, (run, count, unit) in benchmarks().items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = {'ns': measure(run, args.repeat) / count * 1e9,
+                         'unit': unit}
+
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{'benchmark':<22} {'ns/op':>10} {'baseline':>10} {'change':>8}")
+    regressions = []
+    for name, result in results.items():
+        line = f"{name:<22} {result['ns']:>10.1f}"
+        if name in baseline:
+            change = result['ns'] / baseline[name]['ns'] - 1
+            line += f" {baseline[name]['ns']:>10.1f} {change:>+8.1%}"
+            if change > args.tolerance:
+                regressions.append(name)
+                line += '  SLOWER'
+        print(f"{line}  per {result['unit']}")
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Baseline saved to {args.baseline}')
+    elif not baseline:
+        print(f'No baseline at {args.baseline}, run with --save to record one')
+
+    if regressions:
+        print(f"Slower than baseline by more than {args.tolerance:.0%}:"
+              f" {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--save', action='store_true',
+                        help='record the results as the new baseline')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown before failing (0.25 = 25%%)')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--filter', default='',
+                        help='only run benchmarks whose name contains this')
+    sys.exit(main(parser.parse_args()))
@@ -2,45 +2,102 @@
 import asyncio
 from dataclasses import dataclass
 import logging
+import time
 
 _LOGGER = logging.getLogger(__name__)
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform, CONF_PORT
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.storage import Store
 
 from .const import DOMAIN
 
-from .pam245 import (PAM245AsyncSerialConnection,
-                     PAM245AsyncUdpConnection,
-                     PAM245AsyncConnection,
-                     )
+from .pam245 import STATE_KEYS, PAM245AsyncConnection, connection_for_port
 
 PLATFORMS: list[Platform] = [Platform.NUMBER,
                              Platform.MEDIA_PLAYER,
+                             Platform.SENSOR,
                              Platform.SWITCH]
 
+STORAGE_VERSION = 1
+# Seconds to collect state changes into one cache write
+STORAGE_SAVE_DELAY = 10
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up PAM245 from a config entry."""
 
-    config = entry.data[CONF_PORT]
-    if config.startswith('udp:'):
-        _, rx_port, tx_port = config.split(':')
-        data = PAM245AsyncUdpConnection()
-        await data.start(hass.loop, int(rx_port), int(tx_port))
-    else:
-        serial_port = config
-        data = PAM245AsyncSerialConnection()
-        await data.start(hass.loop, serial_port)
+    data, args = connection_for_port(entry.data[CONF_PORT])
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = data
 
+    # Entities start from the last known state rather than defaults
+    await _async_setup_state_cache(hass, entry, data)
+
+    # Entities start out unavailable, or assumed from the cache, the
+    # connection and the device handshake complete in the background
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    _async_track_firmware_version(hass, entry, data)
+    await data.start(hass.loop, *args, wait=False)
 
     return True
 
 
+def _state_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+
+
+async def _async_setup_state_cache(
+    hass: HomeAssistant, entry: ConfigEntry, data: PAM245AsyncConnection
+) -> None:
+    """Restore the cached device state and keep the cache up to date."""
+    api = data.api
+    store = _state_store(hass, entry)
+
+    if (cached := await store.async_load()) is not None:
+        api.restore_state(cached["state"], cached["firmware_version"],
+                          age=time.time() - cached["saved_at"])
+
+    def _data_to_save() -> dict:
+        return {
+            "state": api.state.as_dict(),
+            "firmware_version": api.firmware_version,
+            "saved_at": time.time(),
+        }
+
+    @callback
+    def _async_state_changed() -> None:
+        # Nothing new to save while the device is gone or unconfirmed
+        if api.available and not api.stale:
+            store.async_delay_save(_data_to_save, STORAGE_SAVE_DELAY)
+
+    api.add_callback(_async_state_changed, (*STATE_KEYS, 'firmware_version'))
+    entry.async_on_unload(lambda: api.remove_callback(_async_state_changed))
+
+
+def _async_track_firmware_version(
+    hass: HomeAssistant, entry: ConfigEntry, data: PAM245AsyncConnection
+) -> None:
+    """Update the device registry once the device reports its firmware."""
+    api = data.api
+
+    @callback
+    def _async_firmware_version_changed() -> None:
+        device_registry = dr.async_get(hass)
+        device = device_registry.async_get_device(
+            identifiers={(DOMAIN, entry.unique_id)})
+        if (device is not None and api.firmware_version is not None
+                and device.sw_version != api.firmware_version):
+            device_registry.async_update_device(
+                device.id, sw_version=api.firmware_version)
+
+    api.add_callback(_async_firmware_version_changed, ('firmware_version',))
+    entry.async_on_unload(
+        lambda: api.remove_callback(_async_firmware_version_changed))
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
@@ -48,3 +105,8 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         data.stop()
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the state cache of a deleted config entry."""
+    await _state_store(hass, entry).async_remove()
@@ -1,7 +1,9 @@
 """Config flow for PAM245 integration."""
 import logging
+import os
 from typing import Any
 
+import serial.tools.list_ports
 import voluptuous as vol
 
 from homeassistant import config_entries
@@ -11,20 +13,78 @@ from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 
 from .const import DOMAIN
+from .pam245 import (PAM245AsyncSerialConnection,
+                     PAM245ThreadedSerialConnection,
+                     connection_for_port,
+                     probe_serial_port,
+                     )
 
 _LOGGER = logging.getLogger(__name__)
 
+CONF_MANUAL_PATH = "Enter Manually"
+
+# Seconds to wait for the picked port to answer
+PROBE_TIMEOUT = 2.0
+
+
+def _unique_id(port_info) -> str:
+    """Identify the adapter rather than the path it happens to get."""
+    if port_info.serial_number:
+        return f"{port_info.vid:04x}:{port_info.pid:04x}:{port_info.serial_number}"
+    return port_info.device
+
+
+def _serial_device(port: str) -> str | None:
+    """The device path behind a local serial port string, else None."""
+    try:
+        connection, args = connection_for_port(port)
+    except ValueError:
+        return None
+    if not isinstance(connection, (PAM245AsyncSerialConnection,
+                                   PAM245ThreadedSerialConnection)):
+        return None
+    return os.path.realpath(args[0])
+
+
+async def async_list_ports(hass: HomeAssistant,
+                           exclude: set[str] = frozenset()) -> dict[str, Any]:
+    """Return the port info of the serial ports by device path.
+
+    Nothing is opened: a port may belong to another integration, and
+    writing a probe to it would disturb that one. Ports whose device path
+    is in exclude are left out.
+    """
+    ports = await hass.async_add_executor_job(serial.tools.list_ports.comports)
+    return {port.device: port for port in ports
+            if os.path.realpath(port.device) not in exclude}
+
+
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect.
 
     Data has the keys from STEP_USER_DATA_SCHEMA with values provided by the user.
     """
-    # TODO validate the data can be used to set up a connection.
-    if False:
-        raise InvalidPort
+    try:
+        connection, args = connection_for_port(data[CONF_PORT])
+    except ValueError as err:
+        raise InvalidPort from err
+
+    unique_id = data[CONF_PORT]
+    # Serial ports are local, so check a PAM245 actually answers
+    if isinstance(connection, (PAM245AsyncSerialConnection,
+                               PAM245ThreadedSerialConnection)):
+        if await probe_serial_port(hass.loop, *args, PROBE_TIMEOUT) is None:
+            raise NoResponse
+        # Identify the adapter, so it can't be added twice under two paths
+        device = os.path.realpath(args[0])
+        ports = await hass.async_add_executor_job(serial.tools.list_ports.comports)
+        for port_info in ports:
+            if os.path.realpath(port_info.device) == device:
+                unique_id = _unique_id(port_info)
+                break
 
     # Return info that you want to store in the config entry.
-    return {"title": f"PAM245 ({data[CONF_PORT]})"}
+    return {"title": f"PAM245 ({data[CONF_PORT]})", "unique_id": unique_id}
 
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -39,22 +99,73 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         errors: dict[str, str] = {}
         if user_input is not None:
-            try:
-                info = await validate_input(self.hass, user_input)
-            except InvalidPort:
-                errors["base"] = "invalid_port"
-            except Exception:  # pylint: disable=broad-except
-                _LOGGER.exception("Unexpected exception")
-                errors["base"] = "unknown"
-            else:
-                await self.async_set_unique_id(user_input[CONF_PORT])
-                return self.async_create_entry(title=info["title"], data=user_input)
+            if user_input[CONF_PORT] == CONF_MANUAL_PATH:
+                return await self.async_step_manual()
+            # Only the port the user picked is probed
+            if (result := await self._async_create(user_input, errors)) is not None:
+                return result
+
+        configured = {
+            device
+            for entry in self._async_current_entries()
+            if (device := _serial_device(entry.data[CONF_PORT])) is not None
+        }
+        ports = await async_list_ports(self.hass, configured)
+        if not ports:
+            return await self.async_step_manual()
 
+        options = {
+            port: f"{port} - {port_info.description}"
+            for port, port_info in ports.items()
+        }
+        options[CONF_MANUAL_PATH] = CONF_MANUAL_PATH
         return self.async_show_form(
                 step_id="user",
-                data_schema=vol.Schema({vol.Required(CONF_PORT, default="udp:22222:33333"): str})
+                data_schema=vol.Schema({vol.Required(CONF_PORT): vol.In(options)}),
+                errors=errors,
         )
 
+    async def async_step_manual(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle a port entered by hand."""
+
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            if (result := await self._async_create(user_input, errors)) is not None:
+                return result
+
+        return self.async_show_form(
+                step_id="manual",
+                data_schema=vol.Schema({vol.Required(CONF_PORT, default="udp:22222:33333"): str}),
+                errors=errors,
+        )
+
+
+    async def _async_create(
+        self, user_input: dict[str, Any], errors: dict[str, str]
+    ) -> FlowResult | None:
+        """Create the entry if the port checks out, else fill in errors."""
+        try:
+            info = await validate_input(self.hass, user_input)
+        except InvalidPort:
+            errors["base"] = "invalid_port"
+        except NoResponse:
+            errors["base"] = "no_response"
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Unexpected exception")
+            errors["base"] = "unknown"
+        else:
+            await self.async_set_unique_id(info["unique_id"])
+            self._abort_if_unique_id_configured(
+                    updates={CONF_PORT: user_input[CONF_PORT]})
+            return self.async_create_entry(title=info["title"], data=user_input)
+        return None
+
 
 class InvalidPort(HomeAssistantError):
     """Error to indicate there is invalid port."""
+
+
+class NoResponse(HomeAssistantError):
+    """Error to indicate no PAM245 answered on the port."""
@@ -0,0 +1,39 @@
+"""Diagnostics support for PAM245."""
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PORT
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .pam245 import PAM245AsyncConnection
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    data: PAM245AsyncConnection = hass.data[DOMAIN][entry.entry_id]
+    api = data.api
+    return {
+        "port": entry.data[CONF_PORT],
+        "device": {
+            "available": api.available,
+            "stale": api.stale,
+            "firmware_version": api.firmware_version,
+            "state_version": api.state.version,
+            **api.state.as_dict(),
+        },
+        "link": {
+            "commands_sent": api.commands_sent,
+            "commands_coalesced": api.commands_coalesced,
+            "queue_depth": api.queue_depth,
+            "tx_window": api.tx_window,
+            "tx_in_flight": api.tx_in_flight,
+            "framer_resyncs": api.framer_resyncs,
+            "recent_command_rtts": list(api.command_rtts),
+        },
+        # Only collected while a PAM245 diagnostic sensor is enabled
+        "stats": api.stats.as_dict() if api.stats is not None else None,
+        "wire_trace": api.wire_trace.dump(),
+    }
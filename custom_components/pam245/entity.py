@@ -1,4 +1,6 @@
 """The PAM245 integration entities."""
+import asyncio
+
 from homeassistant.core import callback
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.device_registry import DeviceInfo
@@ -14,6 +16,16 @@ class PAM245Entity(Entity):
     _attr_should_poll = False
     _attr_has_entity_name = True
 
+    # Device fields this entity renders, None for all of them
+    _api_fields: tuple[str, ...] | None = None
+
+    # Fields that can change many times a second (a knob turn on the
+    # amplifier). Their updates are published at most every
+    # _publish_interval seconds and the last one is always published, the
+    # other fields are published right away.
+    _throttled_fields: tuple[str, ...] = ()
+    _publish_interval = 0.5
+
     def __init__(self, unique_id: str, device: PAM245AsyncConnection) -> None:
         """Initialize the entity."""
         self._api = device.api
@@ -25,23 +37,62 @@ class PAM245Entity(Entity):
             model="PAM245",
             sw_version=self._api.firmware_version,
         )
+        self._published_state = self._api.state
+        self._last_publish = 0.0
+        self._trailing_publish: asyncio.TimerHandle | None = None
         self._async_update_attrs()
 
     @callback
     def _async_update_attrs(self) -> None:
         """Update attrs from device."""
-        self._attr_available = self._api.available
+        # Restored from the cache and not confirmed by the device yet: shown
+        # as an assumed state rather than as unavailable
+        self._attr_available = self._api.available or self._api.stale
+        self._attr_assumed_state = self._api.stale
 
     @callback
     def _async_update_from_device(self) -> None:
         """Process an update from the device."""
+        if self._throttled_fields and self._only_throttled_fields_changed():
+            if self._trailing_publish is not None:
+                # The pending publish picks this update up
+                return
+            now = self.hass.loop.time()
+            if (wait := self._last_publish + self._publish_interval - now) > 0:
+                self._trailing_publish = self.hass.loop.call_later(
+                    wait, self._async_publish)
+                return
+        self._async_publish()
+
+    def _only_throttled_fields_changed(self) -> bool:
+        """Whether everything that changed since the last publish is throttled."""
+        api = self._api
+        if ((api.available or api.stale) != self._attr_available
+                or api.stale != self._attr_assumed_state):
+            return False
+        fields = self._api_fields
+        return all(key in self._throttled_fields
+                   for key in api.state.diff(self._published_state)
+                   if fields is None or key in fields)
+
+    @callback
+    def _async_publish(self) -> None:
+        """Write the current device state to HA."""
+        if self._trailing_publish is not None:
+            self._trailing_publish.cancel()
+            self._trailing_publish = None
+        self._last_publish = self.hass.loop.time()
+        self._published_state = self._api.state
         self._async_update_attrs()
         self.async_write_ha_state()
 
     async def async_added_to_hass(self) -> None:
         """Add data updated listener after this object has been initialized."""
-        self._api.add_callback(self._async_update_from_device)
+        self._api.add_callback(self._async_update_from_device, self._api_fields)
 
     async def async_will_remove_from_hass(self) -> None:
         """Remove data updated listener after this object has been initialized."""
         self._api.remove_callback(self._async_update_from_device)
+        if self._trailing_publish is not None:
+            self._trailing_publish.cancel()
+            self._trailing_publish = None
@@ -1,4 +1,6 @@
 """Support for PAM245 amplifier."""
+import voluptuous as vol
+
 from homeassistant import config_entries
 from homeassistant.components.media_player import (
     MediaPlayerEntity,
@@ -9,11 +11,29 @@ from homeassistant.components.media_player import (
 )
 
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv, entity_platform
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from . import DOMAIN
 from .entity import PAM245Entity
-from .pam245 import PAM245Api, PAM245AsyncConnection
+from .pam245 import (
+    PAM245Api, PAM245AsyncConnection, PAM245CommandError, SWITCH_COMMANDS)
+
+SERVICE_APPLY_STATE = "apply_state"
+SERVICE_RAMP_VOLUME = "ramp_volume"
+
+APPLY_STATE_SCHEMA = {
+    vol.Optional("volume"): vol.All(
+        vol.Coerce(int),
+        vol.Range(min=PAM245Api.VOLUME_MIN, max=PAM245Api.VOLUME_MAX)),
+    **{vol.Optional(key): cv.boolean for key in SWITCH_COMMANDS},
+}
+
+RAMP_VOLUME_SCHEMA = {
+    vol.Required("volume_level"): cv.small_float,
+    vol.Required("duration"): vol.All(vol.Coerce(float), vol.Range(min=0)),
+}
 
 
 async def async_setup_entry(
@@ -33,11 +53,19 @@ async def async_setup_entry(
     unique_id = entry.unique_id
     async_add_entities([PAM245MediaPlayer(unique_id, device, description)])
 
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_APPLY_STATE, APPLY_STATE_SCHEMA, "async_apply_state")
+    platform.async_register_entity_service(
+        SERVICE_RAMP_VOLUME, RAMP_VOLUME_SCHEMA, "async_ramp_volume")
+
 
 class PAM245MediaPlayer(PAM245Entity, MediaPlayerEntity):
     """PAM245 media player entity."""
 
     entity_description: MediaPlayerEntityDescription
+    _api_fields = ('volume', 'mute', 'power')
+    _throttled_fields = ('volume',)
     _attr_supported_features = (
           MediaPlayerEntityFeature.VOLUME_STEP
         | MediaPlayerEntityFeature.VOLUME_MUTE
@@ -58,48 +86,55 @@ class PAM245MediaPlayer(PAM245Entity, MediaPlayerEntity):
     @callback
     def _async_update_attrs(self) -> None:
         """Update attrs from device."""
-        self._attr_volume_level = self._api.volume / PAM245Api.VOLUME_MAX
-        self._attr_is_volume_muted = self._api.mute
+        state = self._api.state
+        self._attr_volume_level = state.volume / PAM245Api.VOLUME_MAX
+        self._attr_is_volume_muted = state.get('mute')
         self._attr_state = (MediaPlayerState.ON
-            if self._api.power else MediaPlayerState.STANDBY)
+            if state.get('power') else MediaPlayerState.STANDBY)
         super()._async_update_attrs()
 
-    def turn_on(self) -> None:
+    async def async_turn_on(self) -> None:
         """Turn the media player on."""
         self._api.set_switch('power', True)
-        self._attr_state = MediaPlayerState.ON
-        self.async_write_ha_state()
 
-    def turn_off(self) -> None:
+    async def async_turn_off(self) -> None:
         """Turn the media player off."""
         self._api.set_switch('power', False)
-        self._attr_state = MediaPlayerState.STANDBY
-        self.async_write_ha_state()
 
-    def mute_volume(self, mute: bool) -> None:
+    async def async_mute_volume(self, mute: bool) -> None:
         """Mute the volume."""
         self._api.set_switch('mute', mute)
-        self._attr_is_volume_muted = mute
-        self.async_write_ha_state()
 
-    def set_volume_level(self, volume: float) -> None:
+    async def async_set_volume_level(self, volume: float) -> None:
         """Set volume level, range 0..1."""
         self._api.set_volume(round(volume*PAM245Api.VOLUME_MAX))
-        self._attr_volume_level = volume
-        self.async_write_ha_state()
 
-    def volume_up(self) -> None:
+    async def async_volume_up(self) -> None:
         """Volume up the media player."""
         if (volume := self._api.volume) < PAM245Api.VOLUME_MAX:
             new_device_volume = min(volume + PAM245Api.VOLUME_STEP, PAM245Api.VOLUME_MAX)
             self._api.set_volume(new_device_volume)
-            self._attr_volume_level = new_device_volume / PAM245Api.VOLUME_MAX
-            self.async_write_ha_state()
 
-    def volume_down(self) -> None:
+    async def async_volume_down(self) -> None:
         """Volume down media player."""
         if (volume := self._api.volume) > PAM245Api.VOLUME_MIN:
             new_device_volume = max(volume - PAM245Api.VOLUME_STEP, PAM245Api.VOLUME_MIN)
             self._api.set_volume(new_device_volume)
-            self._attr_volume_level = new_device_volume / PAM245Api.VOLUME_MAX
-            self.async_write_ha_state()
+
+    async def async_apply_state(self, **target) -> None:
+        """Apply a preset, sending only the commands that change something."""
+        try:
+            self._api.apply_state(target)
+        except (PAM245CommandError, ValueError) as err:
+            raise HomeAssistantError(f"Cannot apply state: {err}") from err
+
+    async def async_ramp_volume(self, volume_level: float, duration: float) -> None:
+        """Fade the volume to a level, range 0..1, over duration seconds."""
+        try:
+            self._api.ramp_volume(round(volume_level*PAM245Api.VOLUME_MAX), duration)
+        except (PAM245CommandError, ValueError) as err:
+            raise HomeAssistantError(f"Cannot ramp volume: {err}") from err
+
+    async def async_update(self) -> None:
+        """Re-read the device state, e.g. for homeassistant.update_entity."""
+        self._api.request_refresh()
@@ -40,6 +40,8 @@ class PAM245VolumeNumber(PAM245Entity, NumberEntity):
     """PAM245 volume number entity."""
 
     entity_description: NumberEntityDescription
+    _api_fields = ('volume',)
+    _throttled_fields = ('volume',)
 
     def __init__(self,
                  unique_id: str,
@@ -53,10 +55,9 @@ class PAM245VolumeNumber(PAM245Entity, NumberEntity):
     @callback
     def _async_update_attrs(self) -> None:
         """Update attrs from device."""
-        self._attr_native_value = self._api.volume
+        self._attr_native_value = self._api.state.volume
         super()._async_update_attrs()
 
-    def set_native_value(self, value: float) -> None:
+    async def async_set_native_value(self, value: float) -> None:
         """Set the value."""
         self._api.set_volume(int(value))
-        self.async_write_ha_state()
@@ -1,7 +1,18 @@
 """The PAM245 integration."""
 import asyncio
+from bisect import bisect_left
+from collections import deque
+from functools import partial
 import logging
+import queue
+import random
+import socket
+import threading
+import time
+from typing import NamedTuple
+from urllib.parse import parse_qsl
 
+import serial
 import serial_asyncio
 
 _LOGGER = logging.getLogger(__name__)
@@ -18,142 +29,1277 @@ SWITCH_COMMANDS = {
     'zone_5': 'Zone 5',
     }
 
+# Bit per switch in PAM245State.switches
+SWITCH_BITS = {key: 1 << bit for bit, key in enumerate(SWITCH_COMMANDS)}
+
+STATE_KEYS = ('volume', *SWITCH_COMMANDS)
+# Fields reported by PAM245Api.changes()
+CHANGE_FIELDS = (*STATE_KEYS, 'available', 'stale', 'firmware_version')
+
+LOCALHOST = '127.0.0.1'
+# Bind address for UDP devices on the network
+ANY_ADDRESS = '0.0.0.0'
+
+PROMPT = 'PA>'
+PROMPT_BYTES = PROMPT.encode()
+
+ZONE_KEYS = ('zone_1', 'zone_2', 'zone_3', 'zone_4', 'zone_5')
+
+ZONE_EVENTS = {
+    'All': 'zone_all',
+    '1': 'zone_1',
+    '2': 'zone_2',
+    '3': 'zone_3',
+    '4': 'zone_4',
+    '5': 'zone_5',
+    }
+
 SWITCH_EVENTS = {
     'Mute': 'mute',
     'Power': 'power',
     'Lock': 'system_lock',
     }
 
+class PAM245State(NamedTuple):
+    """Immutable snapshot of the device settings.
+
+    The switches are packed into one int using SWITCH_BITS. version goes up
+    by one with every change, so comparing versions tells whether anything
+    changed between two snapshots.
+    """
+
+    version: int = 0
+    volume: int = 0
+    switches: int = SWITCH_BITS['power']
+
+    def get(self, key: str) -> int | bool:
+        if key == 'volume':
+            return self.volume
+        return bool(self.switches & SWITCH_BITS[key])
+
+    def replace(self, key: str, value: int | bool) -> 'PAM245State':
+        if key == 'volume':
+            return self._replace(version=self.version + 1, volume=value)
+        bit = SWITCH_BITS[key]
+        switches = self.switches | bit if value else self.switches & ~bit
+        return self._replace(version=self.version + 1, switches=switches)
+
+    def diff(self, other: 'PAM245State') -> list[str]:
+        """Keys whose value differs between the two snapshots."""
+        changed = ['volume'] if self.volume != other.volume else []
+        if flipped := self.switches ^ other.switches:
+            changed.extend(key for key, bit in SWITCH_BITS.items()
+                           if flipped & bit)
+        return changed
+
+    def as_dict(self) -> dict:
+        return {key: self.get(key) for key in STATE_KEYS}
+
+
+class PAM245LineFramer:
+    """Split the byte stream from the device into events.
+
+    Bytes are buffered until a line is complete and each line is decoded
+    straight out of the buffer. Lines are decoded as a whole, so a chunk
+    boundary can never split a character. The device prompt is reported as
+    its own event. The rest of the prompt line is the device echoing the
+    command it was sent, it is dropped so it can't pass for a report. A line
+    that grows past MAX_LINE_LENGTH is line noise: it is thrown away up to
+    the next newline.
+    """
+
+    MAX_LINE_LENGTH = 256
+
+    def __init__(self) -> None:
+        self.resyncs = 0
+        self._buffer = bytearray()
+        self._scan_start = 0
+        self._discarding = False
+        self._echo = False
+
+    def reset(self) -> None:
+        self._buffer.clear()
+        self._scan_start = 0
+        self._discarding = False
+        self._echo = False
+
+    def feed(self, data: bytes) -> list[list[str]]:
+        buffer = self._buffer
+        buffer += data
+        events = []
+        start = 0
+        with memoryview(buffer) as view:
+            while (nl := buffer.find(b'\n', self._scan_start)) >= 0:
+                end = nl
+                if end > start and buffer[end - 1] == 0x0D: # \r
+                    end -= 1
+                if self._discarding or end - start > self.MAX_LINE_LENGTH:
+                    if not self._discarding:
+                        self.resyncs += 1
+                    self._discarding = False
+                else:
+                    self._add_line(events, buffer, view, start, end, self._echo)
+                self._echo = False
+                start = self._scan_start = nl + 1
+
+            # The prompt is not followed by a newline, the echo of the next
+            # command may arrive in a later chunk
+            while buffer.startswith(PROMPT_BYTES, start):
+                events.append([PROMPT])
+                start += len(PROMPT_BYTES)
+                self._echo = True
+
+        if len(buffer) - start > self.MAX_LINE_LENGTH:
+            if not self._discarding:
+                self.resyncs += 1
+                self._discarding = True
+            start = len(buffer)
+
+        del buffer[:start]
+        self._scan_start = len(buffer)
+        return events
+
+    @staticmethod
+    def _add_line(events, buffer, view, start, end, echo):
+        # Commands typed after the prompt are echoed on the prompt line
+        while buffer.startswith(PROMPT_BYTES, start):
+            events.append([PROMPT])
+            start += len(PROMPT_BYTES)
+            echo = True
+        if start < end and not echo:
+            event = str(view[start:end], 'ascii', 'replace').split()
+            if event:
+                events.append(event)
+
+
+class PAM245Histogram:
+    # Bucket upper bounds in seconds, the last bucket catches the rest
+    BOUNDS = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005,
+              0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        self.counts[bisect_left(self.BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float) -> float | None:
+        # Upper bound of the bucket holding the q-th value
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.BOUNDS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': self.max,
+            'buckets': dict(zip([*self.BOUNDS, 'inf'], self.counts)),
+            }
+
+
+class PAM245Stats:
+    """I/O counters and latency histograms, only kept while enabled."""
+
+    def __init__(self) -> None:
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.chunks_in = 0
+        self.lines_in = 0
+        self.lines_out = 0
+        self.unknown_events = 0
+        self.notifications = 0
+        self.callbacks = 0
+        self.queue_depth_max = 0
+        self.prompt_timeouts = 0
+        self.refreshes = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.parse_time = PAM245Histogram()
+        self.echo_latency = PAM245Histogram()
+        # I/O worker mode: delay between data arriving and the event loop
+        # handling it, and chunks handed over per batch
+        self.loop_lag = PAM245Histogram()
+        self.worker_batches = 0
+        self.worker_chunks = 0
+
+    def as_dict(self) -> dict:
+        return {
+            key: value.as_dict() if isinstance(value, PAM245Histogram) else value
+            for key, value in vars(self).items()
+            }
+
+
+class PAM245WireTrace:
+    """Ring buffer of the most recent raw frames on the link.
+
+    Frames are kept as (timestamp, direction, bytes) with the bytes capped
+    at MAX_FRAME, so the trace never holds more than
+    MAX_FRAMES * MAX_FRAME bytes of data.
+    """
+
+    MAX_FRAMES = 256
+    MAX_FRAME = 256
+
+    def __init__(self, max_frames: int = MAX_FRAMES) -> None:
+        self._frames = deque(maxlen=max_frames)
+
+    def rx(self, data: bytes) -> None:
+        self._frames.append((time.time(), 'rx', bytes(data[:self.MAX_FRAME])))
+
+    def tx(self, data: bytes) -> None:
+        self._frames.append((time.time(), 'tx', bytes(data[:self.MAX_FRAME])))
+
+    def dump(self) -> list[dict]:
+        return [
+            {
+                'time': timestamp,
+                'direction': direction,
+                'data': data.decode('ascii', 'backslashreplace'),
+            }
+            for timestamp, direction, data in self._frames
+            ]
+
+
+class PAM245CommandError(Exception):
+    """A command was not confirmed by the device."""
+
+
+class PAM245CommandTimeout(PAM245CommandError):
+    """The device did not echo a command in time."""
+
+
+class PAM245CommandSuperseded(PAM245CommandError):
+    """A newer command for the same setting replaced the command."""
+
+
+class _EchoWaiter:
+    __slots__ = ('command', 'future', 'timeout', 'retries', 'timer')
+
+    def __init__(self, command, future, timeout, retries):
+        self.command = command
+        self.future = future
+        self.timeout = timeout
+        self.retries = retries
+        self.timer = None
+
+    def finish(self, exc=None):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.future.done():
+            if exc is None:
+                self.future.set_result(None)
+            else:
+                self.future.set_exception(exc)
+
+
+class PAM245Change(NamedTuple):
+    """One field changing, as yielded by PAM245Api.changes()."""
+
+    seq: int
+    field: str
+    old: int | bool | str | None
+    new: int | bool | str | None
+
+
+class PAM245Snapshot(NamedTuple):
+    """All fields at once, stands in for changes a consumer fell behind on."""
+
+    seq: int
+    state: PAM245State
+    available: bool
+    stale: bool
+    firmware_version: str | None
+
+
+class _ChangeSubscriber:
+    __slots__ = ('items', 'maxsize', 'overflow', 'dropped', 'waiter')
+
+    def __init__(self, maxsize, overflow):
+        self.items = deque()
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self.waiter = None
+
+
+class _OptimisticValue:
+    __slots__ = ('value', 'command', 'rollback', 'superseded', 'timer')
+
+    def __init__(self, rollback):
+        self.value = None
+        self.command = None
+        self.rollback = rollback
+        # Values of earlier commands for the key, their echoes are stale
+        self.superseded = set()
+        self.timer = None
+
+
+class _VolumeRamp:
+    __slots__ = ('start', 'target', 'started', 'duration', 'interval',
+                 'published', 'command', 'handle')
+
+    def __init__(self, start, target, started, duration, interval):
+        self.start = start
+        self.target = target
+        self.started = started
+        self.duration = duration
+        self.interval = interval
+        self.published = started
+        self.command = None
+        self.handle = None
+
+
 class PAM245Api:
     VOLUME_MIN = 0
     VOLUME_MAX = 79
     VOLUME_STEP = 3
 
-    def __init__(self) -> None:
-        # Read/write
-        self.volume = 0
-        self.mute = False
-        self.power = True
-        self.system_lock = False
-        self.zone_all = False
-        self.zone_1 = False
-        self.zone_2 = False
-        self.zone_3 = False
-        self.zone_4 = False
-        self.zone_5 = False
+    # 9600 baud 8N1 puts ten bits on the wire per byte
+    LINK_BYTES_PER_SECOND = 960
+
+    # Echo wait per attempt (seconds) and resends for awaitable commands
+    COMMAND_TIMEOUT = 1.0
+    COMMAND_RETRIES = 2
+
+    # A volume line takes ~12 ms at 9600 baud, stepping a ramp at most every
+    # 100 ms keeps the link mostly free and gives the amplifier time to
+    # process each step
+    RAMP_INTERVAL_MIN = 0.1
+    # Intermediate ramp volumes are published at most this often (seconds)
+    RAMP_PUBLISH_INTERVAL = 1.0
+
+    # Commands written ahead of the device's PA> prompts. Every prompt
+    # returns a credit, the window halves when prompts or echoes go missing
+    # and grows back by about one command per window of prompts
+    TX_WINDOW = 2
+    # Seconds without a prompt before its credit is written off
+    PROMPT_TIMEOUT = 1.0
+
+    # State is refreshed with Now after the link has been idle this long
+    # (seconds), after suspected drift, or on request. Refreshes only go out
+    # on an otherwise empty queue and use at most RECONCILE_BUDGET of the
+    # link, a Now answer is about NOW_RESPONSE_BYTES long
+    RECONCILE_IDLE = 300.0
+    RECONCILE_BUDGET = 0.05
+    NOW_RESPONSE_BYTES = 200
+
+    # Seconds a value set by a command is shown without the device
+    # confirming it, before it rolls back to the last reported value.
+    # Covers queueing, pacing and the echo resends.
+    OPTIMISTIC_TIMEOUT = 5.0
+
+    # What changes() does when a subscriber's queue is full
+    OVERFLOW_DROP_OLDEST = 'drop_oldest'
+    OVERFLOW_SNAPSHOT = 'snapshot'
+
+    # A restored state younger than this (seconds) skips the Now dump on
+    # connect when the device reports the cached firmware version. It stays
+    # stale until a refresh CACHE_CONFIRM_DELAY seconds later confirms it,
+    # once the startup traffic has died down: the firmware says nothing
+    # about whether someone turned a knob meanwhile
+    CACHE_MAX_AGE = 900.0
+    CACHE_CONFIRM_DELAY = 60.0
+
+    def __init__(self, tx_window: int = TX_WINDOW) -> None:
+        # Read/write, see the properties below
+        self._state = PAM245State()
 
         # Read only
-        self.firmware_version = "0.0.todo"
+        self.firmware_version = None
         self.serial = "TODOserialnumber"
 
         # Other
         self.available = False
-        self._callbacks = set()
-        self._unparsed = ''
+        self.stale = False
+        self.commands_sent = 0
+        self.commands_coalesced = 0
+        self.framer_resyncs = 0
+        self.command_rtts = deque(maxlen=64)
+        self.stats = None
+        self._stats_users = 0
+        self.wire_trace = PAM245WireTrace()
+        self._callbacks = {}
+        self._dirty = {}
+        self._subscribers = []
+        # Field values as last reported to the subscribers
+        self._published = {}
+        self._change_seq = 0
+        self._framer = PAM245LineFramer()
+        self._loop = None
+        self._loop_thread = None
+        self._send_data_to_device = None
+
+        # Event handlers by leading token
+        self._event_handlers = {
+            PROMPT: self._handle_prompt,
+            'PA': self._handle_version,
+            'Volume': self._handle_volume,
+            'Zone': self._handle_zone,
+            }
+        for event_type, key in SWITCH_EVENTS.items():
+            self._event_handlers[event_type] = partial(self._handle_switch, key)
+
+        # Outbound queue of command per key, in send order
+        self._tx_queue = {}
+        # Command matching the state the device is known/expected to be in
+        self._tx_state = {}
+        # (command, loop time) of the last command sent per key, for the
+        # echo latency
+        self._tx_sent_at = {}
+        self._tx_handle = None
+        self._tx_ready_at = 0.0
+        self._tx_paused = False
+        self.tx_window_max = tx_window
+        self._tx_window = float(tx_window)
+        self._tx_in_flight = 0
+        self._tx_credit_timer = None
+        self._refresh_requested = False
+        self._refresh_ready_at = 0.0
+        self._idle_timer = None
+        self._last_activity = 0.0
+        # Keys restored from a cache and not reported by the device yet
+        self._stale_keys = set()
+        self._cache_check = False
+        self._cache_timer = None
+        # Awaitable commands waiting for their echo, by key
+        self._echo_waiters = {}
+        # Commanded values waiting for the device to confirm them, by key
+        self._optimistic = {}
+        self._ramp = None
+
+    @property
+    def state(self) -> PAM245State:
+        return self._state
+
+    volume = property(lambda self: self._state.volume)
+    mute = property(lambda self: self._state.get('mute'))
+    power = property(lambda self: self._state.get('power'))
+    system_lock = property(lambda self: self._state.get('system_lock'))
+    zone_all = property(lambda self: self._state.get('zone_all'))
+    zone_1 = property(lambda self: self._state.get('zone_1'))
+    zone_2 = property(lambda self: self._state.get('zone_2'))
+    zone_3 = property(lambda self: self._state.get('zone_3'))
+    zone_4 = property(lambda self: self._state.get('zone_4'))
+    zone_5 = property(lambda self: self._state.get('zone_5'))
+
+    def enable_stats(self) -> PAM245Stats:
+        # Reference counted, collected while anyone still wants them
+        self._stats_users += 1
+        if self.stats is None:
+            self.stats = PAM245Stats()
+        return self.stats
+
+    def disable_stats(self) -> None:
+        self._stats_users = max(self._stats_users - 1, 0)
+        if not self._stats_users:
+            self.stats = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._tx_queue)
+
+    @property
+    def tx_window(self) -> int:
+        return int(self._tx_window)
+
+    @property
+    def tx_in_flight(self) -> int:
+        return self._tx_in_flight
 
     def event_connection_made(self, send_data_fn):
+        if (stats := self.stats) is not None:
+            stats.connects += 1
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
         self._send_data_to_device = send_data_fn
-        self.available = True
-        self._call_callbacks() # Advertise availability
+        self._framer.reset()
+        self._tx_state.clear()
+        self._tx_sent_at.clear()
+        self._reset_credits()
+        self._last_activity = time.monotonic()
+        self._arm_idle_timer(self.RECONCILE_IDLE)
+        # Available once the device answers, an open port alone says
+        # nothing about whether the amplifier is on the other end
+
+        # Commands issued while the connection was down
+        pending, self._tx_queue = self._tx_queue, {}
+        for command in ('', 'Version', 'Now'):
+            pending.pop(command, None)
 
         # Make sure no half-typed commands from previous sessions
         # interfere with the next commands
-        self._send_command('')
+        self._queue_command('')
 
         # Reset device state
-        self._send_command('Version') # Get firmware version
-        self._send_command('Now') # Get current state
+        self._queue_command('Version') # Get firmware version
+        self._tx_queue.update(pending)
+        if not self._cache_check:
+            self._queue_command('Now') # Get current state, after pending commands
+
+    def pause_writing(self):
+        self._tx_paused = True
+
+    def resume_writing(self):
+        self._tx_paused = False
+        if self._loop is not None:
+            self._schedule_tx()
 
     def event_connection_lost(self, send_data_fn):
+        if (stats := self.stats) is not None:
+            stats.disconnects += 1
         self._send_data_to_device = None
-        self.available = False
+        self._reset_credits()
+        self._refresh_requested = False
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        if self._cache_timer is not None:
+            # The next connection reads the state with Now
+            self._cache_timer.cancel()
+            self._cache_timer = None
+        # Its steps would pile up in the queue and replay on reconnect
+        if (ramp := self._ramp) is not None:
+            if (ramp.command is not None
+                    and self._tx_queue.get('volume') == ramp.command):
+                del self._tx_queue['volume']
+            self._cancel_ramp()
+        # Awaitable commands can't be echoed without a link, their callers
+        # decide whether to try again
+        waiters, self._echo_waiters = self._echo_waiters, {}
+        for key, key_waiters in waiters.items():
+            for waiter in key_waiters:
+                self._command_failed(key, waiter, PAM245CommandError(
+                        f'Connection lost: "{waiter.command}"'))
+        self._set_field('available', False)
         self._call_callbacks() # Advertise unavailability
 
+    def restore_state(self, state: dict, firmware_version: str | None,
+                      age: float) -> None:
+        """Start from a cached state, stale until the device confirms it.
+
+        age is how many seconds ago the cache was written.
+        """
+        for key in STATE_KEYS:
+            if key in state:
+                self._set_field(key, state[key])
+        self._set_field('firmware_version', firmware_version)
+        self._set_field('stale', True)
+        self._stale_keys = set(STATE_KEYS)
+        self._cache_check = (firmware_version is not None
+                             and age <= self.CACHE_MAX_AGE)
+        self._call_callbacks()
+
+    def request_refresh(self, reason: str = 'requested') -> None:
+        """Re-read the device state with Now once the link is quiet."""
+        if (self._send_data_to_device is None or self._refresh_requested
+                or 'Now' in self._tx_queue):
+            # A fresh connection reads the state anyway
+            return
+        _LOGGER.debug("State refresh: %s", reason)
+        self._refresh_requested = True
+        self._schedule_tx()
+
+    def _arm_idle_timer(self, delay):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        self._idle_timer = self._loop.call_later(delay, self._idle_check)
+
+    def _idle_check(self):
+        # Re-armed from the last activity instead of on every byte
+        idle = time.monotonic() - self._last_activity
+        if idle >= self.RECONCILE_IDLE:
+            self.request_refresh('link idle')
+            idle = 0.0
+        self._arm_idle_timer(self.RECONCILE_IDLE - idle)
+
     def set_volume(self, volume: int) -> None:
         if self.VOLUME_MIN <= volume <= self.VOLUME_MAX:
-            self.volume = volume
-            _LOGGER.info(f"Set volume to {volume}")
-            self._send_command(f"Volume {volume:02}")
+            _LOGGER.info("Set volume to %s", volume)
+            self._submit_command(self._volume_command(volume), 'volume', volume)
         else:
-            _LOGGER.warning(f"Commanded volume out of range ({volume})")
+            _LOGGER.warning("Commanded volume out of range (%s)", volume)
 
     def set_switch(self, key: str, value: bool) -> None:
-        setattr(self, key, value)
-        _LOGGER.info(f"Set {key} to {value}")
-        self._send_command(f"{SWITCH_COMMANDS[key]} {1 if value else 0}")
+        _LOGGER.info("Set %s to %s", key, value)
+        self._submit_command(self._switch_command(key, value), key, value)
+
+    def async_set_volume(self, volume: int,
+                         timeout: float = COMMAND_TIMEOUT,
+                         retries: int = COMMAND_RETRIES) -> asyncio.Future:
+        """Set the volume, the future resolves once the device echoes it."""
+        if not self.VOLUME_MIN <= volume <= self.VOLUME_MAX:
+            raise ValueError(f"Commanded volume out of range ({volume})")
+        _LOGGER.info("Set volume to %s", volume)
+        return self._async_command(self._volume_command(volume), 'volume',
+                                   volume, timeout, retries)
+
+    def async_set_switch(self, key: str, value: bool,
+                         timeout: float = COMMAND_TIMEOUT,
+                         retries: int = COMMAND_RETRIES) -> asyncio.Future:
+        """Set a switch, the future resolves once the device echoes it."""
+        _LOGGER.info("Set %s to %s", key, value)
+        return self._async_command(self._switch_command(key, value), key,
+                                   value, timeout, retries)
+
+    def apply_state(self, target: dict) -> list[str]:
+        """Move the device to a target state with as few commands as needed.
+
+        target maps state keys (volume, mute, power, zone_1, ...) to values,
+        keys left out are not touched. zone_all sets every zone not listed
+        explicitly. Must be called from the event loop. Returns the queued
+        commands.
+        """
+        if self._loop is None:
+            raise PAM245CommandError('No connection')
+        target = dict(target)
+        if (zone_all := target.pop('zone_all', None)) is not None:
+            for zone_key in ZONE_KEYS:
+                target.setdefault(zone_key, zone_all)
+        if (volume := target.get('volume')) is not None and not (
+                self.VOLUME_MIN <= volume <= self.VOLUME_MAX):
+            raise ValueError(f"Commanded volume out of range ({volume})")
+
+        state = self._state
+        changed = {key: value for key, value in target.items()
+                   if state.get(key) != value}
+        zones = {key: changed.pop(key) for key in ZONE_KEYS if key in changed}
 
-    def add_callback(self, callback):
-        self._callbacks.add(callback)
+        commands = []
+        # Power on before anything else, power off after everything else
+        power = changed.pop('power', None)
+        if power:
+            commands.append(('power', self._switch_command('power', True)))
+        for key, value in changed.items():
+            if key == 'volume':
+                commands.append((key, self._volume_command(value)))
+            else:
+                commands.append((key, self._switch_command(key, value)))
+        final_zones = {key: zones.get(key, state.get(key)) for key in ZONE_KEYS}
+        if len(zones) > 1 and len(set(final_zones.values())) == 1:
+            # One Zone 0 line does the job of the individual zone lines
+            zone_all = final_zones['zone_1']
+            commands.append(('zone_all',
+                             self._switch_command('zone_all', zone_all)))
+            zones['zone_all'] = zone_all
+        else:
+            commands.extend((key, self._switch_command(key, value))
+                            for key, value in zones.items())
+            if state.get('zone_all') != all(final_zones.values()):
+                zones['zone_all'] = all(final_zones.values())
+        if power is False:
+            commands.append(('power', self._switch_command('power', False)))
+            changed['power'] = False
+        elif power:
+            changed['power'] = True
+
+        commanded = dict(commands)
+        for key, value in {**changed, **zones}.items():
+            if key in commanded:
+                self._set_optimistic(key, value, commanded[key])
+            else:
+                # Follows from the zones, the device does not report it
+                self._set_field(key, value)
+        for key, command in commands:
+            _LOGGER.debug('Apply state: "%s"', command)
+            self._queue_command(command, key)
+        self._call_callbacks()
+        return [command for _, command in commands]
+
+    def ramp_volume(self, volume: int, duration: float) -> None:
+        """Move the volume gradually to a new value over duration seconds.
+
+        Any other volume command cancels the ramp. Must be called from the
+        event loop.
+        """
+        if self._loop is None:
+            raise PAM245CommandError('No connection')
+        if not self.VOLUME_MIN <= volume <= self.VOLUME_MAX:
+            raise ValueError(f"Commanded volume out of range ({volume})")
+        self._cancel_ramp()
+        # The ramp publishes the volume from here
+        self._drop_optimistic('volume')
+        start = self._state.volume
+        if (steps := abs(volume - start)) == 0:
+            return
+        _LOGGER.info("Ramp volume from %s to %s over %ss", start, volume, duration)
+        interval = max(duration / steps, self.RAMP_INTERVAL_MIN)
+        self._ramp = _VolumeRamp(start, volume, self._loop.time(), duration,
+                                 interval)
+        self._ramp.handle = self._loop.call_later(interval, self._ramp_step)
+
+    def _ramp_step(self):
+        ramp = self._ramp
+        now = self._loop.time()
+        elapsed = now - ramp.started
+        fraction = min(elapsed / ramp.duration, 1.0) if ramp.duration > 0 else 1.0
+        volume = round(ramp.start + (ramp.target - ramp.start) * fraction)
+        if volume != self._state.volume:
+            self._state = self._state.replace('volume', volume)
+            ramp.command = self._volume_command(volume)
+            self._queue_command(ramp.command, 'volume')
+
+        done = fraction >= 1.0
+        if done:
+            self._ramp = None
+        else:
+            ramp.handle = self._loop.call_later(ramp.interval, self._ramp_step)
+        if done or now - ramp.published >= self.RAMP_PUBLISH_INTERVAL:
+            ramp.published = now
+            self._dirty['volume'] = None
+            self._call_callbacks()
+
+    def cancel_ramp(self) -> None:
+        """Stop a volume ramp where it is, if one is running."""
+        self._cancel_ramp()
+        self._call_callbacks()
+
+    def _cancel_ramp(self):
+        if (ramp := self._ramp) is not None:
+            self._ramp = None
+            ramp.handle.cancel()
+            _LOGGER.debug("Volume ramp to %s cancelled", ramp.target)
+            # Publish where the ramp stopped
+            self._dirty['volume'] = None
+
+    def add_callback(self, callback, fields=None):
+        # Callbacks with fields only run when one of those fields changed,
+        # availability and staleness changes are always reported
+        if fields is not None:
+            fields = frozenset(fields) | {'available', 'stale'}
+        self._callbacks[callback] = fields
 
     def remove_callback(self, callback):
-        self._callbacks.discard(callback)
+        self._callbacks.pop(callback, None)
+
+    async def changes(self, maxsize: int = 64,
+                      overflow: str = OVERFLOW_DROP_OLDEST):
+        """Yield every published change as a PAM245Change, from the first
+        iteration on.
+
+        Each subscriber gets its own queue of up to maxsize items, so a slow
+        consumer never holds up the parser. On a full queue the oldest
+        change is dropped (the gap shows in seq), or with OVERFLOW_SNAPSHOT
+        the queue collapses into one PAM245Snapshot of everything. Breaking
+        out of the loop unsubscribes once the generator is closed, wrap it
+        in contextlib.aclosing() to unsubscribe right away.
+        """
+        if overflow not in (self.OVERFLOW_DROP_OLDEST, self.OVERFLOW_SNAPSHOT):
+            raise ValueError(f"Unknown overflow policy {overflow!r}")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        if not self._subscribers:
+            self._published = {key: self._field(key) for key in CHANGE_FIELDS}
+        subscriber = _ChangeSubscriber(maxsize, overflow)
+        self._subscribers.append(subscriber)
+        try:
+            while True:
+                if subscriber.items:
+                    yield subscriber.items.popleft()
+                    continue
+                subscriber.waiter = asyncio.get_running_loop().create_future()
+                try:
+                    await subscriber.waiter
+                finally:
+                    subscriber.waiter = None
+        finally:
+            self._subscribers.remove(subscriber)
+
+    def _field(self, key):
+        if key in STATE_KEYS:
+            return self._state.get(key)
+        return getattr(self, key)
+
+    def _publish_changes(self, dirty):
+        published = self._published
+        changes = []
+        for key in dirty:
+            new = self._field(key)
+            if (old := published.get(key)) != new:
+                published[key] = new
+                self._change_seq += 1
+                changes.append(PAM245Change(self._change_seq, key, old, new))
+        if not changes:
+            return
+        snapshot = None
+        for subscriber in self._subscribers:
+            items = subscriber.items
+            for change in changes:
+                if len(items) >= subscriber.maxsize:
+                    subscriber.dropped += 1
+                    if subscriber.overflow == self.OVERFLOW_SNAPSHOT:
+                        # The snapshot covers this change and the rest
+                        if snapshot is None:
+                            snapshot = PAM245Snapshot(
+                                    self._change_seq, self._state,
+                                    self.available, self.stale,
+                                    self.firmware_version)
+                        items.clear()
+                        items.append(snapshot)
+                        break
+                    items.popleft()
+                items.append(change)
+            if (waiter := subscriber.waiter) is not None and not waiter.done():
+                waiter.set_result(None)
 
     def _process_events_from_device(self, events):
+        handlers = self._event_handlers
         for event in events:
-            match event:
-                case ['PA', date, version]:
-                    self.firmware_version = f"PA {date} {version}"
-                case ['Volume', volume_str]:
-                    volume = int(volume_str)
-                    self._event_volume(volume)
-                case ['Zone', zone_id, 'Out', value_str]:
-                    if zone_id == 'All':
-                        zone_id = 'all'
-                    value = True if value_str == 'On' else False
-                    self._event_switch(f'zone_{zone_id}', value)
-                case [event_type, value_str] if event_type in SWITCH_EVENTS:
-                    key = SWITCH_EVENTS[event_type]
-                    value = True if value_str == 'On' else False
-                    self._event_switch(key, value)
-                case _:
-                    unknown_event = ' '.join(event)
-                    _LOGGER.warning(f'Unknown event: {unknown_event}')
+            handler = handlers.get(event[0])
+            if handler is None or not handler(event):
+                # Counted in the stats, a noisy link makes plenty of these
+                _LOGGER.debug("Unknown event: %s", event)
+                if (stats := self.stats) is not None:
+                    stats.unknown_events += 1
+
+        # Notify once for everything that arrived together
+        self._call_callbacks()
+
+    def _handle_prompt(self, event):
+        # Device is ready for the next command
+        if len(event) != 1:
+            return False
+        if not self.available:
+            self._set_field('available', True)
+        if self._tx_in_flight:
+            self._tx_in_flight -= 1
+            self._tx_window = min(self._tx_window + 1 / self._tx_window,
+                                  self.tx_window_max)
+            self._arm_credit_timer()
+            self._schedule_tx()
+        return True
+
+    def _handle_version(self, event):
+        match event:
+            case ['PA', date, version]:
+                firmware_version = f"PA {date} {version}"
+                self._set_field('available', True)
+                if self._cache_check:
+                    self._cache_check = False
+                    if firmware_version == self.firmware_version:
+                        _LOGGER.debug("Firmware matches the cache, deferring Now")
+                        self._cache_timer = self._loop.call_later(
+                                self.CACHE_CONFIRM_DELAY, self._confirm_cache)
+                    else:
+                        self._queue_command('Now')
+                self._set_field('firmware_version', firmware_version)
+                return True
+        return False
+
+    def _handle_volume(self, event):
+        match event:
+            case ['Volume', volume_str] if volume_str.isdigit():
+                self._event_volume(int(volume_str))
+                return True
+        return False
+
+    def _handle_zone(self, event):
+        match event:
+            case ['Zone', zone_id, 'Out', 'On' | 'Off' as value_str] if (
+                    zone_id in ZONE_EVENTS):
+                self._event_switch(ZONE_EVENTS[zone_id], value_str == 'On')
+                return True
+        return False
+
+    def _handle_switch(self, key, event):
+        match event:
+            # Anything else is line noise, not the switch turning off
+            case [_, 'On' | 'Off' as value_str]:
+                self._event_switch(key, value_str == 'On')
+                return True
+        return False
 
     def _event_volume(self, volume):
         if self.VOLUME_MIN <= volume <= self.VOLUME_MAX:
-            self.volume = volume
-            self._call_callbacks()
+            if self._stale_keys:
+                self._confirm_restored('volume')
+            if self._ramp is not None:
+                # Published by the ramp at its own pace
+                self._state = self._state.replace('volume', volume)
+            elif ('volume' not in self._optimistic
+                    or self._settle_optimistic('volume', volume)):
+                self._set_field('volume', volume)
+            command = self._tx_state['volume'] = self._volume_command(volume)
+            self._echo_received('volume', command)
+            self._confirm_command('volume', command)
         else:
-            _LOGGER.warning(f"Event volume out of range ({volume})")
+            _LOGGER.warning("Event volume out of range (%s)", volume)
 
     def _event_switch(self, key, value):
-        setattr(self, key, value)
-        self._call_callbacks()
+        if self._stale_keys:
+            self._confirm_restored(key)
+        if key not in self._optimistic or self._settle_optimistic(key, value):
+            self._set_field(key, value)
+        command = self._tx_state[key] = self._switch_command(key, value)
+        self._echo_received(key, command)
+        self._confirm_command(key, command)
+
+    def _confirm_cache(self):
+        self._cache_timer = None
+        if self.stale:
+            self.request_refresh('restored cache')
+
+    def _confirm_restored(self, key):
+        self._stale_keys.discard(key)
+        if not self._stale_keys:
+            self._set_field('stale', False)
+
+    def _set_field(self, key, value):
+        if key in STATE_KEYS:
+            if self._state.get(key) != value:
+                self._state = self._state.replace(key, value)
+                self._dirty[key] = None
+        elif getattr(self, key) != value:
+            setattr(self, key, value)
+            self._dirty[key] = None
 
     def _call_callbacks(self):
-        for callback in self._callbacks:
-            callback()
+        if not (dirty := self._dirty):
+            return
+        self._dirty = {}
+        if self._subscribers:
+            self._publish_changes(dirty)
+        called = 0
+        for callback, fields in list(self._callbacks.items()):
+            if fields is None or not fields.isdisjoint(dirty):
+                callback()
+                called += 1
+        if (stats := self.stats) is not None:
+            stats.notifications += 1
+            stats.callbacks += called
+
+    @staticmethod
+    def _volume_command(volume):
+        return f"Volume {volume:02}"
+
+    @staticmethod
+    def _switch_command(key, value):
+        return f"{SWITCH_COMMANDS[key]} {1 if value else 0}"
+
+    def _submit_command(self, command, key, value):
+        # Safe from any thread: the state and the transmit queue belong to
+        # the event loop, callers on the loop skip the thread hop
+        if self._loop is None:
+            _LOGGER.error('Command dropped (no connection): "%s"', command)
+        elif threading.get_ident() == self._loop_thread:
+            self._queue_user_command(command, key, value)
+        else:
+            self._loop.call_soon_threadsafe(
+                    self._queue_user_command, command, key, value)
+
+    def _queue_user_command(self, command, key, value):
+        self._set_optimistic(key, value, command)
+        self._queue_command(command, key)
+        self._call_callbacks()
+
+    def _set_optimistic(self, key, value, command):
+        # Published right away, then confirmed by the echo, overridden by a
+        # different report or rolled back after OPTIMISTIC_TIMEOUT
+        if (pending := self._optimistic.get(key)) is None:
+            pending = self._optimistic[key] = _OptimisticValue(
+                    self._state.get(key))
+        else:
+            pending.timer.cancel()
+            pending.superseded.add(pending.value)
+        pending.value = value
+        pending.command = command
+        pending.timer = self._loop.call_later(
+                self.OPTIMISTIC_TIMEOUT, self._optimistic_expired, key)
+        self._set_field(key, value)
+
+    def _settle_optimistic(self, key, value):
+        # Whether a value reported by the device should be applied
+        pending = self._optimistic[key]
+        if value != pending.value and value in pending.superseded:
+            # Echo of an earlier command, the latest one is still coming
+            return False
+        pending.timer.cancel()
+        del self._optimistic[key]
+        return True
+
+    def _drop_optimistic(self, key):
+        if (pending := self._optimistic.pop(key, None)) is not None:
+            pending.timer.cancel()
+
+    def _optimistic_expired(self, key):
+        self._roll_back_optimistic(key)
+        # As with a missed echo, the device is falling behind
+        self._tx_congested()
+        self.request_refresh('unconfirmed command')
+
+    def _roll_back_optimistic(self, key):
+        pending = self._optimistic.pop(key)
+        pending.timer.cancel()
+        if self._tx_queue.get(key) == pending.command:
+            # Not sent yet, and no longer what the user sees: sending it
+            # later, e.g. on reconnect, would apply a value rolled back
+            del self._tx_queue[key]
+        _LOGGER.warning("%s %s not confirmed by the device, rolling back to %s",
+                        key, pending.value, pending.rollback)
+        self._set_field(key, pending.rollback)
+        self._call_callbacks()
+
+    def _async_command(self, command, key, value, timeout, retries):
+        if self._send_data_to_device is None:
+            # Its echo deadline would only start once the link is back
+            future = asyncio.get_running_loop().create_future()
+            future.set_exception(
+                    PAM245CommandError(f'No connection: "{command}"'))
+            return future
+        future = self._loop.create_future()
+        waiter = _EchoWaiter(command, future, timeout, retries)
+        self._echo_waiters.setdefault(key, []).append(waiter)
+        self._queue_user_command(command, key, value)
+        return future
+
+    def _echo_received(self, key, command):
+        sent = self._tx_sent_at.get(key)
+        if sent is not None and sent[0] == command:
+            del self._tx_sent_at[key]
+            latency = self._loop.time() - sent[1]
+            self.command_rtts.append(latency)
+            if (stats := self.stats) is not None:
+                stats.echo_latency.add(latency)
+
+    def _confirm_command(self, key, command):
+        if not (waiters := self._echo_waiters.get(key)):
+            return
+        for waiter in [w for w in waiters if w.command == command]:
+            waiters.remove(waiter)
+            waiter.finish()
+        if not waiters:
+            del self._echo_waiters[key]
+
+    def _supersede_commands(self, key, command):
+        if not (waiters := self._echo_waiters.get(key)):
+            return
+        for waiter in [w for w in waiters if w.command != command]:
+            waiters.remove(waiter)
+            waiter.finish(PAM245CommandSuperseded(waiter.command))
+        if not waiters:
+            del self._echo_waiters[key]
+
+    def _command_sent(self, key, command):
+        for waiter in self._echo_waiters.get(key, ()):
+            if waiter.command == command:
+                if waiter.timer is not None:
+                    waiter.timer.cancel()
+                waiter.timer = self._loop.call_later(
+                        waiter.timeout, self._command_timed_out, key, waiter)
+
+    def _command_timed_out(self, key, waiter):
+        waiter.timer = None
+        if waiter.future.done():
+            # Abandoned by the caller
+            self._echo_waiters[key].remove(waiter)
+        elif waiter.retries > 0:
+            waiter.retries -= 1
+            _LOGGER.warning('No echo for "%s", resending', waiter.command)
+            self._tx_congested()
+            self.request_refresh('missed echo')
+            if self._tx_queue.get(key) != waiter.command:
+                self._queue_command(waiter.command, key)
+            return
+        else:
+            self._echo_waiters[key].remove(waiter)
+            self._command_failed(key, waiter, PAM245CommandTimeout(waiter.command))
+            self._tx_congested()
+            self.request_refresh('missed echo')
+        if not self._echo_waiters[key]:
+            del self._echo_waiters[key]
+
+    def _command_failed(self, key, waiter, exc):
+        waiter.finish(exc)
+        if ((pending := self._optimistic.get(key)) is not None
+                and pending.command == waiter.command):
+            self._roll_back_optimistic(key)
+
+    def _queue_command(self, command, key=None):
+        # Commands without a key (handshake, queries) only collapse with an
+        # identical unsent command, keyed ones replace the unsent command
+        # for the same key
+        if key is None:
+            if command in self._tx_queue:
+                self.commands_coalesced += 1
+                return
+            key = command
+        else:
+            if (key == 'volume' and self._ramp is not None
+                    and command != self._ramp.command):
+                self._cancel_ramp()
+            self._supersede_commands(key, command)
+            if self._tx_queue.get(key) == command:
+                self.commands_coalesced += 1
+                return
+            if key in self._tx_queue:
+                del self._tx_queue[key]
+                self.commands_coalesced += 1
+                if self._tx_state.get(key) == command:
+                    # The unsent command was undone, nothing left to send
+                    _LOGGER.debug('Command undone before sending: "%s"', command)
+                    self._drop_optimistic(key)
+                    self._confirm_command(key, command)
+                    return
+        # (Re-)insert at the end to keep the order the commands were issued
+        self._tx_queue[key] = command
+        if (stats := self.stats) is not None:
+            stats.queue_depth_max = max(stats.queue_depth_max,
+                                        len(self._tx_queue))
+        self._schedule_tx()
+
+    def _reset_credits(self):
+        if self._tx_credit_timer is not None:
+            self._tx_credit_timer.cancel()
+            self._tx_credit_timer = None
+        self._tx_in_flight = 0
+        self._tx_window = float(self.tx_window_max)
+
+    def _arm_credit_timer(self):
+        # Times the oldest outstanding prompt, restarted whenever one arrives
+        if self._tx_credit_timer is not None:
+            self._tx_credit_timer.cancel()
+            self._tx_credit_timer = None
+        if self._tx_in_flight:
+            self._tx_credit_timer = self._loop.call_later(
+                    self.PROMPT_TIMEOUT, self._credit_timed_out)
+
+    def _credit_timed_out(self):
+        self._tx_credit_timer = None
+        _LOGGER.debug("No prompt from the device, writing off its credit")
+        if (stats := self.stats) is not None:
+            stats.prompt_timeouts += 1
+        self._tx_in_flight -= 1
+        self._tx_congested()
+        self.request_refresh('missed prompt')
+        self._arm_credit_timer()
+        self._schedule_tx()
+
+    def _tx_congested(self):
+        # Multiplicative decrease, down to one command at a time
+        self._tx_window = max(self._tx_window / 2, 1.0)
+
+    def _schedule_tx(self):
+        if self._tx_queue:
+            at = self._tx_ready_at
+        elif self._refresh_requested:
+            # Within the bandwidth budget
+            at = max(self._tx_ready_at, self._refresh_ready_at)
+        else:
+            return
+        if self._tx_handle is not None:
+            if self._tx_handle.when() <= at:
+                return
+            # Waiting out the refresh budget, commands must not wait for it
+            self._tx_handle.cancel()
+        self._tx_handle = self._loop.call_at(at, self._flush_tx)
+
+    def _flush_tx(self):
+        self._tx_handle = None
+        if self._send_data_to_device is None or self._tx_paused:
+            # Anything queued is sent once the connection is back or the
+            # transport buffer has drained
+            return
+        if self._tx_in_flight >= int(self._tx_window):
+            # Sent once the device prompts for more
+            return
+        if self._tx_queue:
+            key = next(iter(self._tx_queue))
+            command = self._tx_queue.pop(key)
+        elif self._refresh_requested:
+            if self._loop.time() < self._refresh_ready_at:
+                self._schedule_tx()
+                return
+            key = command = 'Now'
+        else:
+            return
+        if command == 'Now':
+            self._refresh_requested = False
+            self._refresh_ready_at = self._loop.time() + (
+                    self.NOW_RESPONSE_BYTES
+                    / (self.LINK_BYTES_PER_SECOND * self.RECONCILE_BUDGET))
+            if (stats := self.stats) is not None:
+                stats.refreshes += 1
+        elif key in SWITCH_COMMANDS or key == 'volume':
+            self._tx_state[key] = command
+            self._tx_sent_at[key] = (command, self._loop.time())
+            if key == 'zone_all':
+                # Zone 0 changes every zone
+                for zone_key in ZONE_KEYS:
+                    self._tx_state.pop(zone_key, None)
+        self._send_command(command)
+        self._command_sent(key, command)
+        self._tx_in_flight += 1
+        if self._tx_credit_timer is None:
+            self._arm_credit_timer()
+
+        # Hold the next command until this one has made it across the link
+        wire_time = (len(command) + 2) / self.LINK_BYTES_PER_SECOND
+        self._tx_ready_at = self._loop.time() + wire_time
+        self._schedule_tx()
 
     def _send_command(self, command):
         if self._send_data_to_device:
             data = (command+'\r\n').encode()
+            self._last_activity = time.monotonic()
+            self.wire_trace.tx(data)
             self._send_data_to_device(data)
+            self.commands_sent += 1
+            if (stats := self.stats) is not None:
+                stats.bytes_out += len(data)
+                stats.lines_out += 1
         else:
-            _LOGGER.error(f'Command dropped (no connection): "{command}"')
+            _LOGGER.error('Command dropped (no connection): "%s"', command)
 
     def parse_data_from_device(self, data):
-        unparsed = self._unparsed + data.decode()
-        events, self._unparsed = self.split_events(unparsed)
-        _LOGGER.info(f"{events=} {self._unparsed=}")
-        self._process_events_from_device(events)
+        if (stats := self.stats) is not None:
+            start = time.perf_counter()
+        resyncs = self._framer.resyncs
+        events = self._framer.feed(data)
+        self.framed_data_from_device(data, events,
+                                     self._framer.resyncs - resyncs)
+        if stats is not None:
+            stats.parse_time.add(time.perf_counter() - start)
 
-    @staticmethod
-    def split_events(unparsed):
-        events = []
-        while True:
-            try:
-                nl = unparsed.index("\n")
-            except ValueError:
-                break
-            line, unparsed = unparsed[:nl], unparsed[nl+1:]
-            events.append(line.split())
-        return events, unparsed
+    def framed_data_from_device(self, data, events, resyncs=0):
+        # Data already split into events, here or by an I/O worker thread
+        self._last_activity = time.monotonic()
+        self.wire_trace.rx(data)
+        _LOGGER.debug("Events %s", events)
+        self._process_events_from_device(events)
+        if resyncs:
+            self.framer_resyncs += resyncs
+            self.request_refresh('framer resync')
+        if (stats := self.stats) is not None:
+            stats.bytes_in += len(data)
+            stats.chunks_in += 1
+            stats.lines_in += len(events)
 
 
 class PAM245Protocol(asyncio.BaseProtocol):
     def __init__(self, api: PAM245Api):
         self._transport = None
         self.api = api
+        self.closed = asyncio.get_running_loop().create_future()
         super().__init__()
 
     def connection_made(self, transport):
@@ -163,21 +1309,81 @@ class PAM245Protocol(asyncio.BaseProtocol):
 
     def connection_lost(self, exc):
         self._transport = None
-        self.api.event_connection_lost()
+        self.api.event_connection_lost(self.send_data)
+        self.api.resume_writing()
+        if not self.closed.done():
+            self.closed.set_result(exc)
         super().connection_lost(exc)
 
+    def pause_writing(self):
+        self.api.pause_writing()
+
+    def resume_writing(self):
+        self.api.resume_writing()
+
     def send_data(self, data):
         raise NotImplementedError
 
     def pam245_data_received(self, data):
-        _LOGGER.info(f"Received data {data!r}")
+        _LOGGER.debug("Received data %r", data)
         self.api.parse_data_from_device(data)
 
 
+def _backoff_delays(minimum, maximum, jitter):
+    delay = minimum
+    while True:
+        yield delay * random.uniform(1 - jitter, 1 + jitter)
+        delay = min(delay * 2, maximum)
+
+
 class PAM245AsyncConnection:
-    def __init__(self):
-        self.api = PAM245Api()
+    @staticmethod
+    def parse_port(target: str) -> tuple:
+        # Arguments for start() from the part of the port after the scheme
+        raise NotImplementedError
+
+    # Reconnect delays (seconds), doubled after each failed attempt
+    RECONNECT_DELAY_MIN = 0.1
+    RECONNECT_DELAY_MAX = 1.0
+    RECONNECT_JITTER = 0.25
+
+    def __init__(self, tx_window: int = PAM245Api.TX_WINDOW):
+        self.api = PAM245Api(tx_window)
         self._transport = None
+        self._supervisor = None
+
+    async def _connect(self, loop):
+        # Returns (transport, protocol)
+        raise NotImplementedError
+
+    async def _start_supervised(self, loop, wait):
+        if wait:
+            # The first attempt fails loudly, the supervisor takes over
+            # from there
+            transport, protocol = await self._connect(loop)
+            self._start(transport)
+        else:
+            protocol = None
+        self._supervisor = loop.create_task(self._supervise(loop, protocol))
+
+    async def _supervise(self, loop, protocol):
+        while True:
+            if protocol is not None:
+                exc = await protocol.closed
+                self._transport = None
+                _LOGGER.warning("Connection lost (%s), reconnecting", exc)
+            for delay in _backoff_delays(self.RECONNECT_DELAY_MIN,
+                                         self.RECONNECT_DELAY_MAX,
+                                         self.RECONNECT_JITTER):
+                try:
+                    transport, protocol = await self._connect(loop)
+                except OSError as err:
+                    _LOGGER.debug("Connect failed: %s", err)
+                else:
+                    break
+                await asyncio.sleep(delay)
+            _LOGGER.info("Connected")
+            self._start(transport)
 
     def _start(self, transport):
         assert transport is not None
@@ -185,8 +1391,14 @@ class PAM245AsyncConnection:
         self._transport = transport
 
     def stop(self):
-        self._transport.close()
-        self._transport = None
+        # Also when no connection is up to report its loss
+        self.api.cancel_ramp()
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
 
 
 class PAM245SerialProtocol(PAM245Protocol, asyncio.Protocol):
@@ -194,7 +1406,7 @@ class PAM245SerialProtocol(PAM245Protocol, asyncio.Protocol):
         super().__init__(api)
 
     def data_received(self, data):
-        _LOGGER.debug(f"Received serial data {data!r}")
+        _LOGGER.debug("Received serial data %r", data)
         super().pam245_data_received(data)
 
     def send_data(self, data):
@@ -202,30 +1414,538 @@ class PAM245SerialProtocol(PAM245Protocol, asyncio.Protocol):
 
 
 class PAM245AsyncSerialConnection(PAM245AsyncConnection):
-    async def start(self, loop, serial_port: str):
-        transport, protocol = await serial_asyncio.create_serial_connection(
+    @staticmethod
+    def parse_port(target: str) -> tuple:
+        if not target:
+            raise ValueError("Missing serial port")
+        return (target,)
+
+    async def start(self, loop, serial_port: str, wait: bool = True):
+        self._serial_port = serial_port
+        await self._start_supervised(loop, wait)
+
+    async def _connect(self, loop):
+        return await serial_asyncio.create_serial_connection(
                 loop,
                 lambda: PAM245SerialProtocol(self.api),
-                serial_port)
-        self._start(transport)
+                self._serial_port)
 
 
-class PAM245DatagramProtocol(PAM245Protocol, asyncio.DatagramProtocol):
-    def __init__(self, tx_port: int, api: PAM245Api):
-        self._tx_port = tx_port
-        super().__init__(api)
+class PAM245IoWorker:
+    """Serve a blocking device handle from threads instead of the event loop.
 
-    def datagram_received(self, data, addr):
-        _LOGGER.debug(f"Received datagram {data!r} from {addr}")
+    A reader thread reads and frames the data and hands the events over to
+    the event loop in batches, so a stalled loop delays the events but no
+    bytes get lost. A writer thread sends the commands the loop puts on a
+    SimpleQueue. Stands in for the asyncio transport of the connection.
+    """
+
+    READ_SIZE = 256
+
+    def __init__(self, loop, protocol: 'PAM245ThreadedProtocol',
+                 read_fn, write_fn, close_fn) -> None:
+        self._loop = loop
+        self._protocol = protocol
+        self._read = read_fn
+        self._write = write_fn
+        self._close = close_fn
+        self._framer = PAM245LineFramer()
+        self._commands = queue.SimpleQueue()
+        # (data, events, resyncs) waiting for the event loop
+        self._batch = deque()
+        self._delivery_pending = False
+        self._delivery_scheduled_at = 0.0
+        self._closing = False
+        self._threads = [
+            threading.Thread(target=self._read_loop, name='pam245-reader',
+                             daemon=True),
+            threading.Thread(target=self._write_loop, name='pam245-writer',
+                             daemon=True),
+            ]
+
+    def start(self):
+        self._protocol.connection_made(self)
+        for thread in self._threads:
+            thread.start()
+
+    def write(self, data):
+        self._commands.put(data)
+
+    def close(self):
+        self._closing = True
+        self._commands.put(None)
+
+    def _read_loop(self):
+        exc = None
+        try:
+            while not self._closing:
+                if data := self._read(self.READ_SIZE):
+                    resyncs = self._framer.resyncs
+                    events = self._framer.feed(data)
+                    self._hand_over(data, events,
+                                    self._framer.resyncs - resyncs)
+        except OSError as err:
+            exc = err
+        finally:
+            self._closing = True
+            self._commands.put(None)
+            self._close()
+            self._call_soon(self._connection_lost, exc)
+
+    def _write_loop(self):
+        while (data := self._commands.get()) is not None:
+            try:
+                self._write(data)
+            except OSError as err:
+                # The reader reports the connection lost
+                _LOGGER.debug("Write failed: %s", err)
+                self._closing = True
+                break
+
+    def _hand_over(self, data, events, resyncs):
+        # The loop clears the flag before draining, so a batch appended
+        # after the drain always gets a delivery of its own
+        self._batch.append((data, events, resyncs))
+        if not self._delivery_pending:
+            self._delivery_pending = True
+            self._delivery_scheduled_at = time.monotonic()
+            self._call_soon(self._deliver)
+
+    def _call_soon(self, callback, *args):
+        try:
+            self._loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # Event loop closed
+            pass
+
+    def _deliver(self):
+        self._delivery_pending = False
+        lag = time.monotonic() - self._delivery_scheduled_at
+        batch = []
+        while self._batch:
+            batch.append(self._batch.popleft())
+        if batch:
+            self._protocol.batch_received(batch, lag)
+
+    def _connection_lost(self, exc):
+        self._deliver()
+        self._protocol.connection_lost(exc)
+
+
+class PAM245ThreadedProtocol(PAM245Protocol):
+    def send_data(self, data):
+        self._transport.write(data)
+
+    def batch_received(self, batch, lag):
+        api = self.api
+        if (stats := api.stats) is not None:
+            stats.loop_lag.add(lag)
+            stats.worker_batches += 1
+            stats.worker_chunks += len(batch)
+        if len(batch) == 1:
+            api.framed_data_from_device(*batch[0])
+        else:
+            # Everything that piled up during a loop stall at once
+            api.framed_data_from_device(
+                    b''.join(data for data, _, _ in batch),
+                    [event for _, events, _ in batch for event in events],
+                    sum(resyncs for _, _, resyncs in batch))
+
+
+class PAM245ThreadedConnection(PAM245AsyncConnection):
+    """Device I/O and line framing in worker threads, see PAM245IoWorker."""
+
+    # Seconds a blocking read waits before checking for shutdown
+    READ_TIMEOUT = 0.1
+
+    def _open(self):
+        # Blocking, returns (read_fn, write_fn, close_fn)
+        raise NotImplementedError
+
+    async def _connect(self, loop):
+        handle = await loop.run_in_executor(None, self._open)
+        protocol = PAM245ThreadedProtocol(self.api)
+        worker = PAM245IoWorker(loop, protocol, *handle)
+        worker.start()
+        return worker, protocol
+
+
+class PAM245ThreadedSerialConnection(PAM245ThreadedConnection):
+    parse_port = staticmethod(PAM245AsyncSerialConnection.parse_port)
+
+    async def start(self, loop, serial_port: str, wait: bool = True):
+        self._serial_port = serial_port
+        await self._start_supervised(loop, wait)
+
+    def _open(self):
+        port = serial.Serial(self._serial_port, timeout=self.READ_TIMEOUT)
+
+        def read(size):
+            # Wait for the first byte, then take whatever else is there
+            data = port.read(1)
+            if data and (waiting := port.in_waiting):
+                data += port.read(min(waiting, size - 1))
+            return data
+        return read, port.write, port.close
+
+
+class _PAM245ProbeProtocol(asyncio.Protocol):
+    def __init__(self):
+        self.version = asyncio.get_running_loop().create_future()
+        self.prompt_seen = False
+        self._framer = PAM245LineFramer()
+
+    def connection_made(self, transport):
+        transport.write(b'\r\nVersion\r\n')
+
+    def data_received(self, data):
+        for event in self._framer.feed(data):
+            match event:
+                case ['PA', date, version] if not self.version.done():
+                    self.version.set_result(f"PA {date} {version}")
+                case [PROMPT]:
+                    self.prompt_seen = True
+
+
+async def probe_serial_port(loop, serial_port: str,
+                            timeout: float = 2.0) -> str | None:
+    """Check whether a PAM245 answers on a serial port.
+
+    Returns the firmware version the device reported, PROMPT if it only
+    answered with its prompt, or None if nothing answered.
+    """
+    try:
+        transport, protocol = await serial_asyncio.create_serial_connection(
+                loop, _PAM245ProbeProtocol, serial_port, exclusive=True)
+    except OSError as err:
+        _LOGGER.debug("Probe of %s failed: %s", serial_port, err)
+        return None
+    try:
+        return await asyncio.wait_for(protocol.version, timeout)
+    except asyncio.TimeoutError:
+        return PROMPT if protocol.prompt_seen else None
+    finally:
+        transport.close()
+
+
+class PAM245TcpProtocol(PAM245Protocol, asyncio.Protocol):
+    # Keepalive timing (seconds, probes) where the platform supports it
+    KEEPALIVE_OPTIONS = (('TCP_KEEPIDLE', 30),
+                         ('TCP_KEEPINTVL', 10),
+                         ('TCP_KEEPCNT', 3))
+
+    def connection_made(self, transport):
+        if (sock := transport.get_extra_info('socket')) is not None:
+            # Commands are single short lines, send each right away
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Notice a dead serial bridge even when the link is idle
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            for option, value in self.KEEPALIVE_OPTIONS:
+                if hasattr(socket, option):
+                    sock.setsockopt(socket.IPPROTO_TCP,
+                                    getattr(socket, option), value)
+        super().connection_made(transport)
+
+    def data_received(self, data):
+        _LOGGER.debug("Received TCP data %r", data)
         super().pam245_data_received(data)
 
     def send_data(self, data):
-        self._transport.sendto(data, ('localhost', self._tx_port))
+        self._transport.write(data)
+
+
+class PAM245AsyncTcpConnection(PAM245AsyncConnection):
+    @staticmethod
+    def parse_port(target: str) -> tuple:
+        host, sep, port = target.rpartition(':')
+        if not sep or not host or not port.isdigit():
+            raise ValueError(f"Expected tcp://host:port, got {target!r}")
+        return (host.strip('[]'), int(port))
+
+    async def start(self, loop, host: str, port: int, wait: bool = True):
+        self._host = host
+        self._port = port
+        await self._start_supervised(loop, wait)
+
+    async def _connect(self, loop):
+        return await loop.create_connection(
+                lambda: PAM245TcpProtocol(self.api),
+                self._host,
+                self._port)
+
+
+class PAM245DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, hub: 'PAM245DatagramHub'):
+        self._hub = hub
+        super().__init__()
+
+    def connection_made(self, transport):
+        self._hub.event_connection_made(transport)
+
+    def connection_lost(self, exc):
+        self._hub.event_connection_lost(exc)
+
+    def datagram_received(self, data, addr):
+        _LOGGER.debug("Received datagram %r from %s", data, addr)
+        self._hub.datagram_received(data, addr)
+
+
+class PAM245DatagramHub:
+    """Drive any number of amplifiers through one UDP socket.
+
+    Datagrams are routed to each device's PAM245Api by peer address, and the
+    data the devices send during one event loop iteration goes out together
+    from a single callback.
+    """
+
+    # Hubs shared by the UDP connections, by (loop, local address)
+    _hubs: dict[tuple, 'PAM245DatagramHub'] = {}
+
+    def __init__(self) -> None:
+        self._devices: dict[tuple, PAM245Api] = {}
+        self._send_fns = {}
+        self._loop = None
+        self._local_addr = None
+        self._transport = None
+        self._started = None
+        self._stopping = False
+        self._supervisor = None
+        self._tx_pending: dict[tuple, bytearray] = {}
+        self._tx_handle = None
+
+    @classmethod
+    async def acquire(cls, loop, rx_port: int,
+                      host: str = LOCALHOST) -> 'PAM245DatagramHub':
+        key = (loop, host, rx_port)
+        if (hub := cls._hubs.get(key)) is None:
+            hub = cls._hubs[key] = cls()
+            hub._started = loop.create_task(hub.start(loop, rx_port, host))
+        try:
+            await asyncio.shield(hub._started)
+        except Exception:
+            if cls._hubs.get(key) is hub:
+                del cls._hubs[key]
+            raise
+        return hub
+
+    def release(self) -> None:
+        if not self._devices:
+            for key, hub in list(self._hubs.items()):
+                if hub is self:
+                    del self._hubs[key]
+            self.stop()
+
+    async def start(self, loop, rx_port: int, host: str = LOCALHOST):
+        self._loop = loop
+        self._local_addr = (host, rx_port)
+        await self._connect()
+
+    async def _connect(self):
+        await self._loop.create_datagram_endpoint(
+                lambda: PAM245DatagramProtocol(self),
+                self._local_addr)
+
+    async def _supervise(self):
+        for delay in _backoff_delays(PAM245AsyncConnection.RECONNECT_DELAY_MIN,
+                                     PAM245AsyncConnection.RECONNECT_DELAY_MAX,
+                                     PAM245AsyncConnection.RECONNECT_JITTER):
+            await asyncio.sleep(delay)
+            try:
+                await self._connect()
+            except OSError as err:
+                _LOGGER.debug("Reconnect failed: %s", err)
+            else:
+                _LOGGER.info("Reconnected")
+                break
+        self._supervisor = None
+
+    def stop(self):
+        self._stopping = True
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+        if self._transport is not None:
+            self._transport.close()
+
+    def add_device(self, addr, api: PAM245Api | None = None) -> PAM245Api:
+        if api is None:
+            api = PAM245Api()
+        self._devices[addr] = api
+        self._send_fns[addr] = partial(self._send_data, addr)
+        if self._transport is not None:
+            api.event_connection_made(self._send_fns[addr])
+        return api
+
+    def remove_device(self, addr) -> None:
+        api = self._devices.pop(addr)
+        send_fn = self._send_fns.pop(addr)
+        self._tx_pending.pop(addr, None)
+        if self._transport is not None:
+            api.event_connection_lost(send_fn)
+
+    def event_connection_made(self, transport):
+        self._transport = transport
+        for addr, api in self._devices.items():
+            api.event_connection_made(self._send_fns[addr])
+
+    def event_connection_lost(self, exc):
+        self._transport = None
+        self._tx_pending.clear()
+        for addr, api in self._devices.items():
+            api.event_connection_lost(self._send_fns[addr])
+        if not self._stopping and self._supervisor is None:
+            _LOGGER.warning("Connection lost (%s), reconnecting", exc)
+            self._supervisor = self._loop.create_task(self._supervise())
+
+    def datagram_received(self, data, addr):
+        api = self._devices.get(addr[:2])
+        if api is None:
+            if len(self._devices) != 1:
+                _LOGGER.debug("Datagram from unknown peer %s", addr)
+                return
+            # A lone device may answer from any port
+            api = next(iter(self._devices.values()))
+        api.parse_data_from_device(data)
+
+    def _send_data(self, addr, data):
+        if (pending := self._tx_pending.get(addr)) is None:
+            self._tx_pending[addr] = bytearray(data)
+        else:
+            pending += data
+        if self._tx_handle is None:
+            self._tx_handle = self._loop.call_soon(self._flush_tx)
+
+    def _flush_tx(self):
+        self._tx_handle = None
+        pending, self._tx_pending = self._tx_pending, {}
+        if self._transport is not None:
+            for addr, data in pending.items():
+                self._transport.sendto(data, addr)
 
 
 class PAM245AsyncUdpConnection(PAM245AsyncConnection):
-    async def start(self, loop, rx_port: int, tx_port: int):
-        transport, protocol = await loop.create_datagram_endpoint(
-                lambda: PAM245DatagramProtocol(tx_port, self.api),
-                ('localhost', rx_port))
-        self._start(transport)
+    @staticmethod
+    def parse_port(target: str) -> tuple:
+        # udp:RX:TX for a device on this host, udp://host:TX?rx=RX&bind=ADDR
+        # for one on the network. rx defaults to TX, bind to all addresses
+        address, _, query = target.partition('?')
+        host, sep, tx_port = address.rpartition(':')
+        if sep and host.isdigit() and tx_port.isdigit() and not query:
+            return (int(host), int(tx_port), LOCALHOST, LOCALHOST)
+        options = dict(parse_qsl(query))
+        rx_port = options.pop('rx', tx_port)
+        bind = options.pop('bind', ANY_ADDRESS)
+        if (not sep or not host or not tx_port.isdigit()
+                or not rx_port.isdigit() or options):
+            raise ValueError(f"Expected udp:RX:TX or udp://host:TX?rx=RX,"
+                             f" got {target!r}")
+        return (int(rx_port), int(tx_port), host, bind)
+
+    async def start(self, loop, rx_port: int, tx_port: int,
+                    host: str = LOCALHOST, bind: str = LOCALHOST,
+                    wait: bool = True):
+        self._hub = None
+        self._addr = None
+        if wait:
+            await self._attach(loop, rx_port, tx_port, host, bind)
+        else:
+            self._supervisor = loop.create_task(
+                    self._attach(loop, rx_port, tx_port, host, bind))
+
+    async def _attach(self, loop, rx_port, tx_port, host, bind):
+        for delay in _backoff_delays(self.RECONNECT_DELAY_MIN,
+                                     self.RECONNECT_DELAY_MAX,
+                                     self.RECONNECT_JITTER):
+            try:
+                # Datagrams are routed by the address they come from
+                addr_info = await loop.getaddrinfo(
+                        host, tx_port, family=socket.AF_INET,
+                        type=socket.SOCK_DGRAM)
+                hub = await PAM245DatagramHub.acquire(loop, rx_port, bind)
+            except OSError as err:
+                if self._supervisor is None:
+                    raise
+                _LOGGER.debug("Connect failed: %s", err)
+                await asyncio.sleep(delay)
+            else:
+                break
+        self._hub = hub
+        self._addr = addr_info[0][4][:2]
+        self._hub.add_device(self._addr, self.api)
+        self._supervisor = None
+
+    def stop(self):
+        self.api.cancel_ramp()
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        if self._hub is not None:
+            self._hub.remove_device(self._addr)
+            self._hub.release()
+            self._hub = None
+
+
+class PAM245ThreadedUdpConnection(PAM245ThreadedConnection):
+    parse_port = staticmethod(PAM245AsyncUdpConnection.parse_port)
+
+    async def start(self, loop, rx_port: int, tx_port: int,
+                    host: str = LOCALHOST, bind: str = LOCALHOST,
+                    wait: bool = True):
+        self._rx_addr = (bind, rx_port)
+        self._tx_host = host
+        self._tx_port = tx_port
+        await self._start_supervised(loop, wait)
+
+    def _open(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.bind(self._rx_addr)
+            # Resolved once, not on every write
+            tx_addr = socket.getaddrinfo(
+                    self._tx_host, self._tx_port, socket.AF_INET,
+                    socket.SOCK_DGRAM)[0][4][:2]
+        except OSError:
+            sock.close()
+            raise
+        sock.settimeout(self.READ_TIMEOUT)
+
+        def read(size):
+            try:
+                return sock.recv(size)
+            except TimeoutError:
+                return b''
+
+        def write(data):
+            sock.sendto(data, tx_addr)
+        return read, write, sock.close
+
+
+# Connection class by the scheme the port string starts with, a port
+# without a known scheme is a serial port. The +thread variants run the
+# I/O in worker threads, for event loops too busy to service the link
+TRANSPORTS: dict[str, type[PAM245AsyncConnection]] = {
+    'serial': PAM245AsyncSerialConnection,
+    'serial+thread': PAM245ThreadedSerialConnection,
+    'tcp': PAM245AsyncTcpConnection,
+    'udp': PAM245AsyncUdpConnection,
+    'udp+thread': PAM245ThreadedUdpConnection,
+    }
+
+
+def connection_for_port(port: str, **kwargs) -> tuple[PAM245AsyncConnection, tuple]:
+    """Create the connection for a port string and its start() arguments.
+
+    Accepts tcp://host:port, udp:RX:TX for a device on this host,
+    udp://host:TX?rx=RX&bind=ADDR for one on the network (rx defaults to
+    TX, bind to all addresses), serial:///dev/ttyX and plain serial port
+    names, serial+thread:// and udp+thread: for worker thread
+    I/O. Raises ValueError for a malformed port. kwargs go to the
+    connection, e.g. tx_window.
+    """
+    scheme, sep, target = port.partition(':')
+    if sep and scheme in TRANSPORTS:
+        target = target.removeprefix('//')
+    else:
+        scheme, target = 'serial', port
+    connection_class = TRANSPORTS[scheme]
+    args = connection_class.parse_port(target)
+    return connection_class(**kwargs), args
@@ -0,0 +1,181 @@
+"""Support for PAM245 diagnostic sensors."""
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import timedelta
+
+from homeassistant import config_entries
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.typing import StateType
+
+from . import DOMAIN
+from .entity import PAM245Entity
+from .pam245 import PAM245Api, PAM245AsyncConnection
+
+# Counters change with every byte, so poll them instead of pushing
+SCAN_INTERVAL = timedelta(seconds=30)
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+@dataclass(frozen=True, kw_only=True)
+class PAM245SensorEntityDescription(SensorEntityDescription):
+    """Describes a PAM245 diagnostic sensor."""
+
+    value_fn: Callable[[PAM245Api], StateType]
+    entity_category: EntityCategory = EntityCategory.DIAGNOSTIC
+    entity_registry_enabled_default: bool = False
+
+
+PAM245_SENSOR_DESCRIPTIONS = [
+    PAM245SensorEntityDescription(
+        key="bytes_received",
+        name="Bytes received",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda api: api.stats.bytes_in,
+    ),
+    PAM245SensorEntityDescription(
+        key="bytes_sent",
+        name="Bytes sent",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda api: api.stats.bytes_out,
+    ),
+    PAM245SensorEntityDescription(
+        key="lines_received",
+        name="Lines received",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda api: api.stats.lines_in,
+    ),
+    PAM245SensorEntityDescription(
+        key="lines_sent",
+        name="Lines sent",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda api: api.stats.lines_out,
+    ),
+    PAM245SensorEntityDescription(
+        key="commands_coalesced",
+        name="Commands coalesced",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda api: api.commands_coalesced,
+    ),
+    PAM245SensorEntityDescription(
+        key="unknown_events",
+        name="Unknown events",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda api: api.stats.unknown_events,
+    ),
+    PAM245SensorEntityDescription(
+        key="queue_depth",
+        name="Command queue depth",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda api: api.queue_depth,
+    ),
+    PAM245SensorEntityDescription(
+        key="parse_time",
+        name="Parse time per chunk",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda api: _ms(api.stats.parse_time.mean),
+    ),
+    PAM245SensorEntityDescription(
+        key="callback_fanout",
+        name="Callbacks per notification",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda api: (round(api.stats.callbacks / api.stats.notifications, 2)
+                              if api.stats.notifications else None),
+    ),
+    PAM245SensorEntityDescription(
+        key="echo_latency_p50",
+        name="Command echo latency (median)",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda api: _ms(api.stats.echo_latency.quantile(0.5)),
+    ),
+    PAM245SensorEntityDescription(
+        key="echo_latency_p95",
+        name="Command echo latency (95th percentile)",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda api: _ms(api.stats.echo_latency.quantile(0.95)),
+    ),
+    PAM245SensorEntityDescription(
+        key="loop_lag_p95",
+        name="Event loop lag (95th percentile)",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda api: _ms(api.stats.loop_lag.quantile(0.95)),
+    ),
+]
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: config_entries.ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up PAM245 diagnostic sensors."""
+    data: PAM245AsyncConnection = hass.data[DOMAIN][entry.entry_id]
+    device = data
+    unique_id = entry.unique_id
+    async_add_entities(PAM245StatsSensor(unique_id, device, description)
+                       for description in PAM245_SENSOR_DESCRIPTIONS)
+
+
+class PAM245StatsSensor(PAM245Entity, SensorEntity):
+    """PAM245 diagnostic sensor.
+
+    Statistics are only collected while at least one of these sensors is
+    enabled.
+    """
+
+    entity_description: PAM245SensorEntityDescription
+    _attr_should_poll = True
+    _api_fields = ()
+
+    def __init__(self,
+                 unique_id: str,
+                 device: PAM245AsyncConnection,
+                 description: PAM245SensorEntityDescription) -> None:
+        """Initialize the entity."""
+        self._attr_unique_id = f"{unique_id}_{description.key}"
+        self.entity_description = description
+        super().__init__(unique_id, device)
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Update attrs from device."""
+        self._attr_native_value = (
+            self.entity_description.value_fn(self._api)
+            if self._api.stats is not None else None)
+        super()._async_update_attrs()
+
+    async def async_added_to_hass(self) -> None:
+        """Start collecting statistics."""
+        self._api.enable_stats()
+        await super().async_added_to_hass()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop collecting statistics once the last sensor is gone."""
+        self._api.disable_stats()
+        await super().async_will_remove_from_hass()
+
+    async def async_update(self) -> None:
+        """Refresh the statistic."""
+        self._async_update_attrs()
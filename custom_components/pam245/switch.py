@@ -81,23 +81,19 @@ class PAM245Switch(PAM245Entity, SwitchEntity):
         """Initialize the entity."""
         self._attr_unique_id = f"{unique_id}_{description.key}"
         self.entity_description = description
+        self._api_fields = (description.key,)
         super().__init__(unique_id, device)
         
     @callback
     def _async_update_attrs(self) -> None:
         """Update attrs from device."""
-        self._attr_is_on = getattr(self._api,
-                                   self.entity_description.key)
+        self._attr_is_on = self._api.state.get(self.entity_description.key)
         super()._async_update_attrs()
 
-    def turn_on(self, **kwargs) -> None:
+    async def async_turn_on(self, **kwargs) -> None:
         """Turn the entity on."""
         self._api.set_switch(self.entity_description.key, True)
-        self._attr_is_on = True
-        self.async_write_ha_state()
 
-    def turn_off(self, **kwargs) -> None:
-        """Turn the entity on."""
+    async def async_turn_off(self, **kwargs) -> None:
+        """Turn the entity off."""
         self._api.set_switch(self.entity_description.key, False)
-        self._attr_is_on = False
-        self.async_write_ha_state()
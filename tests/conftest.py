@@ -0,0 +1,11 @@
+"""Make the protocol library and the simulator importable.
+
+pam245.py has no Home Assistant imports, so the tests run it standalone
+just like the benchmarks do.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__),
+                                '..', 'custom_components', 'pam245'))
+sys.path.insert(0, os.path.dirname(__file__))
@@ -0,0 +1,265 @@
+"""PAM245 device simulator.
+
+Stands in for the amplifier on the other end of the udp:RX:TX test
+transport, and backs the tests and benchmarks. It implements the command
+set from custom_components/pam245/rs232-notes.txt, echoes each command
+after the prompt, answers with the same events the real amplifier prints
+and paces its output like the 9600 baud serial link. Faults can be
+injected to exercise the parser.
+
+    python tests/simulator.py --listen 33333 --send 22222 [--drop 0.01] [--split]
+
+matches a config entry port of udp:22222:33333.
+"""
+import argparse
+import asyncio
+import logging
+import random
+
+_LOGGER = logging.getLogger(__name__)
+
+LOCALHOST = '127.0.0.1'
+
+ZONE_COUNT = 5
+
+HELP = (
+    'Help        Help function',
+    '?           Help function',
+    'Now         Show all PA status',
+    'Power 1/0/t Power on/off/toggle',
+    'Mute 1/0/t  Mute on/off/toggle',
+    'Volume NN   Volume 00 (min) to 79 (max)',
+    'Zone N 1/0  Zone N on/off, zone 0 is all zones',
+    'Save        Save to memory',
+    'Lock 1/0/t  System lock on/off/toggle',
+    'Version     Version number',
+    )
+
+
+def _on_off(value):
+    return 'On' if value else 'Off'
+
+
+class PAM245Simulator:
+    VOLUME_MAX = 79
+    FIRMWARE_DATE = '2019-08-19'
+    FIRMWARE_VERSION = 'V1.05'
+
+    def __init__(self,
+                 send_fn,
+                 baud: int = 9600,
+                 processing_delay: float = 0.005,
+                 drop_rate: float = 0.0,
+                 garbage_rate: float = 0.0,
+                 split: bool = False,
+                 seed: int | None = None) -> None:
+        # Device state
+        self.power = True
+        self.mute = False
+        self.system_lock = False
+        self.volume = 20
+        self.zones = [False] * ZONE_COUNT
+        self.saved = None
+
+        # Link emulation, 8N1 puts ten bits on the wire per byte
+        self.bytes_per_second = baud / 10
+        self.processing_delay = processing_delay
+        self.drop_rate = drop_rate
+        self.garbage_rate = garbage_rate
+        self.split = split
+        self.commands_processed = 0
+
+        self._send = send_fn
+        self._random = random.Random(seed)
+        self._rx_buffer = bytearray()
+        self._commands = asyncio.Queue()
+        self._output = asyncio.Queue()
+        self._tasks = []
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._process_commands()),
+                       loop.create_task(self._transmit())]
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def feed(self, data: bytes) -> None:
+        self._rx_buffer += data
+        while (nl := self._rx_buffer.find(b'\r')) >= 0:
+            line = self._rx_buffer[:nl].decode('ascii', 'replace')
+            del self._rx_buffer[:nl + 1]
+            self._commands.put_nowait(line.strip('\n').strip())
+        # Line feeds on their own carry no command
+        self._rx_buffer = self._rx_buffer.lstrip(b'\n')
+
+    def handle_command(self, line: str) -> list[str]:
+        match line.split():
+            case []:
+                return []
+            case ['Help' | '?']:
+                return list(HELP)
+            case ['Now']:
+                return self._status()
+            case ['Version']:
+                return [f'PA {self.FIRMWARE_DATE} {self.FIRMWARE_VERSION}']
+            case ['Save']:
+                self.saved = self._status()
+                return ['Saved']
+            case ['Power', value] if value in ('0', '1', 't'):
+                self.power = self._switch(self.power, value)
+                return [f'Power {_on_off(self.power)}']
+            case ['Mute', value] if value in ('0', '1', 't'):
+                self.mute = self._switch(self.mute, value)
+                return [f'Mute {_on_off(self.mute)}']
+            case ['Lock', value] if value in ('0', '1', 't'):
+                self.system_lock = self._switch(self.system_lock, value)
+                return [f'Lock {_on_off(self.system_lock)}']
+            case ['Volume', value] if (value.isdigit()
+                                       and int(value) <= self.VOLUME_MAX):
+                self.volume = int(value)
+                return [f'Volume {self.volume:02}']
+            case ['Zone', zone, value] if (zone.isdigit()
+                                           and int(zone) <= ZONE_COUNT
+                                           and value in ('0', '1')):
+                return self._zone(int(zone), value == '1')
+        return ['Command error']
+
+    @staticmethod
+    def _switch(current, value):
+        return not current if value == 't' else value == '1'
+
+    def _zone(self, zone, value):
+        if zone == 0:
+            self.zones = [value] * ZONE_COUNT
+            return [*self._zone_status(), f'Zone All Out {_on_off(value)}']
+        self.zones[zone - 1] = value
+        return [f'Zone {zone} Out {_on_off(value)}']
+
+    def _zone_status(self):
+        return [f'Zone {zone} Out {_on_off(value)}'
+                for zone, value in enumerate(self.zones, 1)]
+
+    def _status(self):
+        return [
+            f'PA {self.FIRMWARE_DATE} {self.FIRMWARE_VERSION}',
+            f'Power {_on_off(self.power)}',
+            f'Mute {_on_off(self.mute)}',
+            f'Lock {_on_off(self.system_lock)}',
+            f'Volume {self.volume:02}',
+            *self._zone_status(),
+            f'Zone All Out {_on_off(all(self.zones))}',
+            ]
+
+    async def _process_commands(self):
+        while True:
+            line = await self._commands.get()
+            await asyncio.sleep(self.processing_delay)
+            response = self.handle_command(line)
+            self.commands_processed += 1
+            _LOGGER.debug('%r -> %s', line, response)
+            # The command is echoed as typed, on the line after the prompt
+            data = (f'{line}\r\n'
+                    + ''.join(f'{event}\r\n' for event in response) + 'PA>')
+            self._output.put_nowait(data.encode())
+
+    async def _transmit(self):
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        while True:
+            data = self._inject_faults(await self._output.get())
+            for chunk in self._chunks(data):
+                # A byte leaves the device once the previous ones have
+                next_at = max(next_at, loop.time())
+                next_at += len(chunk) / self.bytes_per_second
+                await asyncio.sleep(next_at - loop.time())
+                self._send(chunk)
+
+    def _inject_faults(self, data):
+        if not (self.drop_rate or self.garbage_rate):
+            return data
+        faulty = bytearray()
+        for byte in data:
+            if self._random.random() < self.garbage_rate:
+                faulty.append(self._random.randrange(256))
+            if self._random.random() >= self.drop_rate:
+                faulty.append(byte)
+        return bytes(faulty)
+
+    def _chunks(self, data):
+        if not self.split:
+            yield data
+            return
+        while data:
+            size = self._random.randint(1, 8)
+            yield data[:size]
+            data = data[size:]
+
+
+class PAM245SimulatorProtocol(asyncio.DatagramProtocol):
+    def __init__(self, send_addr, **kwargs):
+        self._send_addr = send_addr
+        self._transport = None
+        self.simulator = PAM245Simulator(self._send_data, **kwargs)
+        super().__init__()
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self.simulator.start()
+
+    def connection_lost(self, exc):
+        self.simulator.stop()
+
+    def datagram_received(self, data, addr):
+        self.simulator.feed(data)
+
+    def _send_data(self, data):
+        self._transport.sendto(data, self._send_addr)
+
+
+async def serve_udp(loop, listen_port: int, send_port: int, **kwargs):
+    """Serve a simulated amplifier, returns (transport, simulator)."""
+    transport, protocol = await loop.create_datagram_endpoint(
+            lambda: PAM245SimulatorProtocol((LOCALHOST, send_port), **kwargs),
+            (LOCALHOST, listen_port))
+    return transport, protocol.simulator
+
+
+async def _main(args):
+    loop = asyncio.get_running_loop()
+    await serve_udp(loop, args.listen, args.send,
+                    baud=args.baud,
+                    processing_delay=args.processing_delay,
+                    drop_rate=args.drop,
+                    garbage_rate=args.garbage,
+                    split=args.split,
+                    seed=args.seed)
+    _LOGGER.info('Simulating PAM245 on udp %s -> %s', args.listen, args.send)
+    await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='PAM245 device simulator')
+    parser.add_argument('--listen', type=int, default=33333,
+                        help='UDP port the integration sends to')
+    parser.add_argument('--send', type=int, default=22222,
+                        help='UDP port the integration listens on')
+    parser.add_argument('--baud', type=int, default=9600)
+    parser.add_argument('--processing-delay', type=float, default=0.005,
+                        help='seconds the device takes per command')
+    parser.add_argument('--drop', type=float, default=0.0,
+                        help='probability of dropping each output byte')
+    parser.add_argument('--garbage', type=float, default=0.0,
+                        help='probability of a garbage byte before each byte')
+    parser.add_argument('--split', action='store_true',
+                        help='split output into small packets')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
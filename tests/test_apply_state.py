@@ -0,0 +1,85 @@
+"""Tests for PAM245Api.apply_state."""
+import asyncio
+
+import pytest
+
+from pam245 import PAM245Api, PAM245CommandError, ZONE_KEYS
+
+
+def apply(target, events=b''):
+    """Apply target on a fresh connection, returns (commands, api)."""
+    async def run():
+        api = PAM245Api()
+        api.event_connection_made(lambda data: None)
+        if events:
+            api.parse_data_from_device(events)
+        commands = api.apply_state(target)
+        # Let the queued commands go nowhere before the loop closes
+        api.event_connection_lost(None)
+        return commands, api
+    return asyncio.run(run())
+
+
+def test_unchanged_keys_skipped():
+    commands, _ = apply({'volume': 30, 'mute': False, 'power': True},
+                        b'Volume 20\r\nMute Off\r\nPower On\r\n')
+    assert commands == ['Volume 30']
+
+
+def test_nothing_to_do():
+    commands, _ = apply({'volume': 20}, b'Volume 20\r\n')
+    assert commands == []
+
+
+def test_power_on_first():
+    commands, _ = apply({'mute': True, 'power': True}, b'Power Off\r\n')
+    assert commands == ['Power 1', 'Mute 1']
+
+
+def test_power_off_last():
+    commands, _ = apply({'power': False, 'volume': 10})
+    assert commands == ['Volume 10', 'Power 0']
+
+
+def test_zones_collapse_to_zone_0():
+    commands, api = apply({key: True for key in ZONE_KEYS})
+    assert commands == ['Zone 0 1']
+    assert api.state.get('zone_all')
+
+
+def test_single_zone():
+    commands, api = apply({'zone_2': True})
+    assert commands == ['Zone 2 1']
+    assert not api.state.get('zone_all')
+
+
+def test_zone_all_fills_unlisted_zones():
+    commands, api = apply({'zone_all': True, 'zone_3': False})
+    assert commands == [f'Zone {zone} 1' for zone in (1, 2, 4, 5)]
+    assert [api.state.get(key) for key in ZONE_KEYS] == [
+        True, True, False, True, True]
+    assert not api.state.get('zone_all')
+
+
+def test_last_zone_completes_zone_all():
+    commands, api = apply(
+            {'zone_5': True},
+            b''.join(f'Zone {zone} Out On\r\n'.encode() for zone in range(1, 5)))
+    assert commands == ['Zone 5 1']
+    assert api.state.get('zone_all')
+
+
+def test_shown_before_confirmed():
+    _, api = apply({'volume': 42, 'mute': True})
+    assert api.volume == 42
+    assert api.state.get('mute')
+
+
+def test_volume_out_of_range():
+    with pytest.raises(ValueError):
+        apply({'volume': PAM245Api.VOLUME_MAX + 1})
+
+
+def test_no_connection():
+    with pytest.raises(PAM245CommandError):
+        PAM245Api().apply_state({'volume': 10})
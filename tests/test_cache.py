@@ -0,0 +1,74 @@
+"""Tests for starting PAM245Api from a cached state."""
+import asyncio
+
+from pam245 import PAM245Api
+
+VERSION = b'PA 2019-08-19 V1.05\r\n'
+
+
+async def connect(firmware_version, age, version_line=VERSION):
+    """Restore a cache and connect, returns (api, commands sent)."""
+    sent = []
+    api = PAM245Api()
+    api.CACHE_CONFIRM_DELAY = 0.2
+    api.restore_state({'volume': 20, 'mute': True}, firmware_version, age)
+    api.event_connection_made(sent.append)
+    await asyncio.sleep(0.05)
+    api.parse_data_from_device(b'PA>\r\nPA>Version\r\n' + version_line + b'PA>')
+    await asyncio.sleep(0.05)
+    return api, sent
+
+
+def test_restored_state_is_stale():
+    api = PAM245Api()
+    api.restore_state({'volume': 20, 'mute': True}, None, 0.0)
+    assert api.volume == 20 and api.mute
+    assert api.stale
+    assert not api.available
+
+
+def test_matching_firmware_defers_now():
+    async def run():
+        api, sent = await connect('PA 2019-08-19 V1.05', 10.0)
+        assert b'Now\r\n' not in sent
+        assert api.stale
+        await asyncio.sleep(0.25)
+        assert sent[-1] == b'Now\r\n'
+        api.parse_data_from_device(
+                b'Now\r\n' + VERSION + b'Power On\r\nMute Off\r\nLock Off\r\n'
+                b'Volume 30\r\n'
+                + b''.join(f'Zone {zone} Out Off\r\n'.encode()
+                           for zone in (1, 2, 3, 4, 5, 'All'))
+                + b'PA>')
+        assert not api.stale
+        assert api.volume == 30 and not api.mute
+        api.event_connection_lost(None)
+    asyncio.run(run())
+
+
+def test_other_firmware_reads_now():
+    async def run():
+        api, sent = await connect('PA 2019-08-19 V1.04', 10.0)
+        assert sent[-1] == b'Now\r\n'
+        assert api.stale
+        api.event_connection_lost(None)
+    asyncio.run(run())
+
+
+def test_old_cache_reads_now_on_connect():
+    async def run():
+        api, sent = await connect('PA 2019-08-19 V1.05',
+                                  PAM245Api.CACHE_MAX_AGE + 1)
+        assert sent[:3] == [b'\r\n', b'Version\r\n', b'Now\r\n']
+        api.event_connection_lost(None)
+    asyncio.run(run())
+
+
+def test_deferred_now_cancelled_on_connection_lost():
+    async def run():
+        api, sent = await connect('PA 2019-08-19 V1.05', 10.0)
+        api.event_connection_lost(None)
+        await asyncio.sleep(0.25)
+        assert b'Now\r\n' not in sent
+        assert api.stale
+    asyncio.run(run())
@@ -0,0 +1,204 @@
+"""Tests for the commands of PAM245Api and their optimistic values."""
+import asyncio
+
+import pytest
+
+from pam245 import (PAM245Api, PAM245CommandError, PAM245CommandSuperseded,
+                    PAM245CommandTimeout)
+
+
+class FakeDevice:
+    """Echoes commands and reports settings like the amplifier does."""
+
+    def __init__(self, api):
+        self.api = api
+        self.sent = []
+        # Commands the device does not act on, as if lost on the way
+        self.ignore = set()
+        api.event_connection_made(self.receive)
+
+    def receive(self, data):
+        command = data.decode().strip()
+        self.sent.append(command)
+        reply = f'{command}\r\n'
+        if command not in self.ignore:
+            match command.split():
+                case ['Volume', volume]:
+                    reply += f'Volume {volume}\r\n'
+                case [name, value]:
+                    reply += f"{name} {'On' if value == '1' else 'Off'}\r\n"
+        asyncio.get_running_loop().call_soon(
+                self.api.parse_data_from_device, (reply + 'PA>').encode())
+
+
+async def connect():
+    api = PAM245Api()
+    device = FakeDevice(api)
+    # Past the handshake
+    await asyncio.sleep(0.1)
+    return api, device
+
+
+def test_confirmed():
+    async def run():
+        api, device = await connect()
+        await api.async_set_volume(30)
+        assert api.volume == 30
+        assert device.sent.count('Volume 30') == 1
+        assert not api._optimistic
+        api.event_connection_lost(None)
+    asyncio.run(run())
+
+
+def test_resent_when_not_echoed():
+    async def run():
+        api, device = await connect()
+        device.ignore.add('Mute 1')
+        future = api.async_set_switch('mute', True, timeout=0.2, retries=2)
+        # Sent and ignored, the resend is not due yet
+        await asyncio.sleep(0.1)
+        device.ignore.clear()
+        await future
+        assert api.mute
+        assert device.sent.count('Mute 1') == 2
+        api.event_connection_lost(None)
+    asyncio.run(run())
+
+
+def test_timeout_rolls_back():
+    async def run():
+        api, device = await connect()
+        await api.async_set_volume(30)
+        device.ignore.add('Volume 50')
+        future = api.async_set_volume(50, timeout=0.05, retries=1)
+        assert api.volume == 50
+        with pytest.raises(PAM245CommandTimeout):
+            await future
+        assert device.sent.count('Volume 50') == 2
+        assert api.volume == 30
+        api.event_connection_lost(None)
+    asyncio.run(run())
+
+
+def test_superseded():
+    async def run():
+        api, device = await connect()
+        first = api.async_set_volume(30)
+        second = api.async_set_volume(40)
+        with pytest.raises(PAM245CommandSuperseded):
+            await first
+        await second
+        assert api.volume == 40
+        # Replaced before it was sent
+        assert 'Volume 30' not in device.sent
+        api.event_connection_lost(None)
+    asyncio.run(run())
+
+
+def test_link_down_fails_right_away():
+    async def run():
+        api, _ = await connect()
+        api.event_connection_lost(None)
+        with pytest.raises(PAM245CommandError):
+            await asyncio.wait_for(api.async_set_volume(50, timeout=0.2,
+                                                        retries=0), 1.0)
+        assert not api._tx_queue.get('volume')
+    asyncio.run(run())
+
+
+def test_connection_lost_fails_waiters():
+    async def run():
+        api, device = await connect()
+        await api.async_set_volume(30)
+        device.ignore.add('Volume 50')
+        future = api.async_set_volume(50)
+        await asyncio.sleep(0.05)
+        api.event_connection_lost(None)
+        with pytest.raises(PAM245CommandError):
+            await future
+        assert api.volume == 30
+    asyncio.run(run())
+
+
+def test_never_connected():
+    async def run():
+        with pytest.raises(PAM245CommandError):
+            await PAM245Api().async_set_volume(10)
+    asyncio.run(run())
+
+
+def test_optimistic_confirmed():
+    async def run():
+        api, device = await connect()
+        api.set_volume(30)
+        assert api.volume == 30
+        assert api._optimistic
+        await asyncio.sleep(0.1)
+        assert api.volume == 30
+        assert not api._optimistic
+        api.event_connection_lost(None)
+    asyncio.run(run())
+
+
+def test_optimistic_overridden_by_report():
+    async def run():
+        api, device = await connect()
+        device.ignore.add('Volume 30')
+        api.set_volume(30)
+        await asyncio.sleep(0.1)
+        # Someone turned the knob on the amplifier
+        api.parse_data_from_device(b'\r\nVolume 25\r\nPA>')
+        assert api.volume == 25
+        assert not api._optimistic
+        api.event_connection_lost(None)
+    asyncio.run(run())
+
+
+def test_superseded_echo_ignored():
+    async def run():
+        api, device = await connect()
+        device.ignore.update(('Volume 30', 'Volume 40'))
+        api.set_volume(30)
+        await asyncio.sleep(0.05)
+        api.set_volume(40)
+        # The report of the first command arrives after the second was issued
+        api.parse_data_from_device(b'Volume 30\r\nVolume 30\r\nPA>')
+        assert api.volume == 40
+        api.parse_data_from_device(b'Volume 40\r\nVolume 40\r\nPA>')
+        assert api.volume == 40
+        assert not api._optimistic
+        api.event_connection_lost(None)
+    asyncio.run(run())
+
+
+def test_optimistic_rolled_back():
+    async def run():
+        api, device = await connect()
+        await api.async_set_volume(30)
+        api.OPTIMISTIC_TIMEOUT = 0.1
+        device.ignore.add('Volume 50')
+        api.set_volume(50)
+        await asyncio.sleep(0.2)
+        assert api.volume == 30
+        assert not api._optimistic
+        api.event_connection_lost(None)
+    asyncio.run(run())
+
+
+def test_rollback_drops_unsent_command():
+    async def run():
+        api, device = await connect()
+        await api.async_set_volume(30)
+        api.OPTIMISTIC_TIMEOUT = 0.1
+        api.event_connection_lost(None)
+        api.set_volume(50)
+        assert api._tx_queue['volume'] == 'Volume 50'
+        await asyncio.sleep(0.2)
+        assert api.volume == 30
+        assert 'volume' not in api._tx_queue
+        # Nothing rolled back is replayed on reconnect
+        api.event_connection_made(device.receive)
+        await asyncio.sleep(0.1)
+        assert 'Volume 50' not in device.sent
+        api.event_connection_lost(None)
+    asyncio.run(run())
@@ -0,0 +1,47 @@
+"""Tests for how PAM245Api reads the device output."""
+import asyncio
+
+from pam245 import PAM245Api
+
+
+def parse(*chunks):
+    """Feed chunks to a fresh connection, returns the api."""
+    async def run():
+        api = PAM245Api()
+        api.event_connection_made(lambda data: None)
+        for chunk in chunks:
+            api.parse_data_from_device(chunk)
+        api.event_connection_lost(None)
+        return api
+    return asyncio.run(run())
+
+
+def test_reports():
+    api = parse(b'Power On\r\nMute On\r\nVolume 30\r\nZone 2 Out On\r\nPA>')
+    assert api.power and api.mute
+    assert api.volume == 30
+    assert api.state.get('zone_2')
+
+
+def test_typed_echo_is_not_a_report():
+    api = parse(b'Power On\r\nMute On\r\nVolume 30\r\n',
+                b'PA>Power 0\r\nPA>Mute 0\r\nPA>Volume 50\r\n')
+    assert api.power and api.mute
+    assert api.volume == 30
+
+
+def test_typed_echo_after_prompt_chunk():
+    api = parse(b'Volume 30\r\nPA>', b'Volume 50\r\n')
+    assert api.volume == 30
+
+
+def test_switch_values_other_than_on_off_ignored():
+    api = parse(b'Power On\r\nMute On\r\nZone 1 Out On\r\n',
+                b'Power 1\r\nMute O?n\r\nZone 1 Out 0\r\n')
+    assert api.power and api.mute
+    assert api.state.get('zone_1')
+
+
+def test_switch_off():
+    api = parse(b'Power On\r\nMute On\r\n', b'Power Off\r\nMute Off\r\n')
+    assert not api.power and not api.mute
@@ -0,0 +1,82 @@
+"""Tests for PAM245LineFramer."""
+from pam245 import PROMPT, PAM245LineFramer
+
+
+def feed_bytewise(framer, data):
+    events = []
+    for i in range(len(data)):
+        events += framer.feed(data[i:i + 1])
+    return events
+
+
+def test_lines_and_prompt():
+    framer = PAM245LineFramer()
+    assert framer.feed(b'Volume 20\r\nMute Off\r\nPA>') == [
+        ['Volume', '20'], ['Mute', 'Off'], [PROMPT]]
+
+
+def test_repeated_prompts():
+    framer = PAM245LineFramer()
+    assert framer.feed(b'PA>PA>PA>') == [[PROMPT]] * 3
+
+
+def test_repeated_prompts_before_echo():
+    # Commands written ahead of the prompts are echoed on the prompt line
+    framer = PAM245LineFramer()
+    assert framer.feed(b'PA>PA>Volume 20\r\nVolume 20\r\nPA>') == [
+        [PROMPT], [PROMPT], ['Volume', '20'], [PROMPT]]
+
+
+def test_split_anywhere():
+    data = b'PA 2019-08-19 V1.05\r\nPA>PA>Zone 1 Out On\r\nPA>'
+    expected = PAM245LineFramer().feed(data)
+    assert feed_bytewise(PAM245LineFramer(), data) == expected
+    for cut in range(len(data)):
+        framer = PAM245LineFramer()
+        assert framer.feed(data[:cut]) + framer.feed(data[cut:]) == expected
+
+
+def test_blank_lines_ignored():
+    framer = PAM245LineFramer()
+    assert framer.feed(b'\r\n\r\nPower On\n') == [['Power', 'On']]
+
+
+def test_undecodable_bytes_replaced():
+    framer = PAM245LineFramer()
+    assert framer.feed(b'Volume \xff0\r\n') == [['Volume', '�0']]
+
+
+def test_overlong_line_discarded():
+    framer = PAM245LineFramer()
+    noise = b'x' * (PAM245LineFramer.MAX_LINE_LENGTH + 1)
+    assert framer.feed(noise) == []
+    assert framer.feed(noise + b'\r\nVolume 20\r\n') == [['Volume', '20']]
+    assert framer.resyncs == 1
+
+
+def test_reset_drops_partial_line():
+    framer = PAM245LineFramer()
+    assert framer.feed(b'Volu') == []
+    framer.reset()
+    assert framer.feed(b'Mute On\r\n') == [['Mute', 'On']]
+
+
+def test_typed_echo_dropped():
+    framer = PAM245LineFramer()
+    assert framer.feed(b'PA>Power 1\r\nPower On\r\nPA>') == [
+        [PROMPT], ['Power', 'On'], [PROMPT]]
+
+
+def test_typed_echo_in_later_chunk():
+    framer = PAM245LineFramer()
+    assert framer.feed(b'Mute On\r\nPA>') == [['Mute', 'On'], [PROMPT]]
+    assert framer.feed(b'Volume 30\r\n') == []
+    assert framer.feed(b'Volume 30\r\nPA>') == [['Volume', '30'], [PROMPT]]
+
+
+def test_typed_echo_split_anywhere():
+    data = b'PA>Volume 30\r\nVolume 30\r\nPA>Mute 1\r\nMute On\r\nPA>'
+    expected = [[PROMPT], ['Volume', '30'], [PROMPT], ['Mute', 'On'], [PROMPT]]
+    for cut in range(len(data)):
+        framer = PAM245LineFramer()
+        assert framer.feed(data[:cut]) + framer.feed(data[cut:]) == expected
@@ -0,0 +1,49 @@
+"""Tests for the volume ramp of PAM245Api."""
+import asyncio
+
+from pam245 import PAM245Api, PAM245AsyncTcpConnection
+
+
+async def ramp(duration):
+    api = PAM245Api()
+    api.event_connection_made(lambda data: None)
+    api.ramp_volume(20, duration)
+    return api
+
+
+def test_ramp_reaches_target():
+    async def run():
+        api = await ramp(0.3)
+        await asyncio.sleep(0.5)
+        assert api.volume == 20
+        # Held back by the handshake, which the test does not prompt for
+        assert api._tx_queue['volume'] == 'Volume 20'
+        assert api._ramp is None
+        api.event_connection_lost(None)
+    asyncio.run(run())
+
+
+def test_connection_lost_cancels_ramp():
+    async def run():
+        api = await ramp(10.0)
+        await asyncio.sleep(0.3)
+        api.event_connection_lost(None)
+        volume = api.volume
+        assert api._ramp is None
+        await asyncio.sleep(0.3)
+        assert api.volume == volume
+        # Nothing left to replay on reconnect
+        assert 'volume' not in api._tx_queue
+    asyncio.run(run())
+
+
+def test_stop_cancels_ramp():
+    async def run():
+        connection = PAM245AsyncTcpConnection()
+        api = connection.api
+        api.event_connection_made(lambda data: None)
+        api.ramp_volume(20, 10.0)
+        connection.stop()
+        assert api._ramp is None
+        api.event_connection_lost(None)
+    asyncio.run(run())
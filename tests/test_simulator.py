@@ -0,0 +1,106 @@
+"""PAM245Api against the simulator over the udp:RX:TX transport.
+
+With faults injected on the device output the API may lose echoes, prompts
+and whole lines, but once the link goes quiet its state has to converge on
+the simulator's.
+"""
+import asyncio
+import socket
+
+import pytest
+
+from pam245 import LOCALHOST, ZONE_KEYS, connection_for_port
+from simulator import serve_udp
+
+# Seconds for the state to converge after the last command
+CONVERGE_TIMEOUT = 20.0
+
+FAULTS = {
+    'clean': {},
+    'split': {'split': True},
+    'drop': {'drop_rate': 0.01, 'split': True},
+    'garbage': {'garbage_rate': 0.01, 'split': True},
+    'drop+garbage': {'drop_rate': 0.01, 'garbage_rate': 0.01, 'split': True},
+    }
+
+
+def free_udp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind((LOCALHOST, 0))
+        return sock.getsockname()[1]
+
+
+def device_state(simulator):
+    return {
+        'volume': simulator.volume,
+        'mute': simulator.mute,
+        'power': simulator.power,
+        'system_lock': simulator.system_lock,
+        'zone_all': all(simulator.zones),
+        **dict(zip(ZONE_KEYS, simulator.zones)),
+        }
+
+
+async def converge(api, simulator, timeout=CONVERGE_TIMEOUT):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        if (api.available and not api._optimistic and not api._tx_queue
+                and api.state.as_dict() == device_state(simulator)):
+            return
+        # A corrupted line can go unnoticed until the next refresh
+        api.request_refresh('test')
+        await asyncio.sleep(0.1)
+    assert api.available
+    assert api.state.as_dict() == device_state(simulator)
+
+
+async def run_session(faults, seed, port='udp:{rx}:{tx}'):
+    loop = asyncio.get_running_loop()
+    api_port, device_port = free_udp_port(), free_udp_port()
+    transport, simulator = await serve_udp(
+            loop, device_port, api_port, seed=seed, **faults)
+    connection, args = connection_for_port(
+            port.format(rx=api_port, tx=device_port))
+    api = connection.api
+    # Refresh as often as the tests like, the link is not shared
+    api.RECONCILE_BUDGET = 1.0
+    try:
+        await connection.start(loop, *args)
+        await converge(api, simulator)
+        if not faults:
+            # Noise that happens to be printable can end up in the version
+            assert api.firmware_version == (f'PA {simulator.FIRMWARE_DATE}'
+                                            f' {simulator.FIRMWARE_VERSION}')
+
+        # Commands back to back, well ahead of the device's prompts
+        for volume in (25, 30, 35, 40):
+            api.set_volume(volume)
+        api.set_switch('mute', True)
+        api.set_switch('zone_2', True)
+        api.apply_state({'zone_all': True, 'zone_4': False, 'system_lock': True})
+        api.apply_state({'volume': 15, 'power': False})
+
+        await converge(api, simulator)
+        assert api.state.as_dict() == {
+            'volume': 15, 'mute': True, 'power': False, 'system_lock': True,
+            'zone_all': False, 'zone_1': True, 'zone_2': True, 'zone_3': True,
+            'zone_4': False, 'zone_5': True,
+            }
+    finally:
+        connection.stop()
+        transport.close()
+        simulator.stop()
+
+
+@pytest.mark.parametrize('faults', FAULTS.values(), ids=FAULTS.keys())
+def test_converges(faults):
+    asyncio.run(run_session(faults, seed=1))
+
+
+@pytest.mark.parametrize('port', [
+    'udp://localhost:{tx}?rx={rx}&bind=127.0.0.1',
+    'udp+thread://localhost:{tx}?rx={rx}&bind=127.0.0.1',
+    ])
+def test_peer_by_host_name(port):
+    asyncio.run(run_session(FAULTS['split'], seed=1, port=port))